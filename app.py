@@ -1,5 +1,26 @@
+import io
+import logging
+import os
+
 import streamlit as st
-from speech_master import SpeechGenerator, PresentationCoach
+from metrics import register_health_check, start_metrics_server
+from speech_master import SpeechGenerator, PresentationCoach, read_binary_file
+from speech_pipeline import SpeechQualityLoop
+from speech_prefetch import SpeculativePrefetcher
+from prompt_registry import get_prompt_registry
+from tts_engine import get_tts_engine
+
+logging.basicConfig(
+    level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
+)
+
+# Warm the TTS engine and render the voice previews in the background when
+# the server starts, not on the first "Generate Audio".
+tts_engine = get_tts_engine(SpeechGenerator.TTS_VOICES).start()
+register_health_check("tts", tts_engine.health)
+
+if os.environ.get("SPEECH_MASTER_METRICS_PORT"):
+    start_metrics_server(int(os.environ["SPEECH_MASTER_METRICS_PORT"]))
 
 st.set_page_config(
     page_title="Speech Master AI",
@@ -75,11 +96,18 @@ if "generator" not in st.session_state:
 if "coach" not in st.session_state:
     st.session_state.coach = PresentationCoach()
 
+if "prefetcher" not in st.session_state:
+    st.session_state.prefetcher = None
+
 if "last_speech" not in st.session_state:
     st.session_state.last_speech = None
 
 if "last_audio" not in st.session_state:
     st.session_state.last_audio = None
+elif st.session_state.last_audio and not os.path.exists(st.session_state.last_audio):
+    st.session_state.last_audio = None
+
+prompt_registry = get_prompt_registry()
 
 st.markdown('<h1 class="main-header">🎤 Speech Master AI</h1>', unsafe_allow_html=True)
 
@@ -103,6 +131,7 @@ with st.sidebar:
             if api_key:
                 try:
                     st.session_state.generator = SpeechGenerator(api_key)
+                    st.session_state.prefetcher = None
                     st.session_state.api_key_saved = True
                     st.success("API key saved successfully!")
                 except Exception as e:
@@ -147,11 +176,11 @@ if page == "📝 Speech Generator":
                 duration = st.slider("Duration (minutes):", 1, 15, 3)
                 emotion = st.selectbox(
                     "Speech Style:",
-                    options=list(SpeechGenerator.STYLE_TEMPLATES.keys()),
+                    options=prompt_registry.style_names(),
                 )
                 audience = st.selectbox(
                     "Target Audience:",
-                    options=list(SpeechGenerator.AUDIENCE_GUIDANCE.keys()),
+                    options=prompt_registry.audience_names(),
                 )
 
         with col2:
@@ -163,18 +192,55 @@ if page == "📝 Speech Generator":
                 )
                 temperature = st.slider("Creativity (Temperature):", 0.1, 1.0, 0.7, 0.1)
                 voice_type = st.radio(
-                    "Text-to-Speech Voice:", options=["male", "female"]
+                    "Text-to-Speech Voice:",
+                    options=list(SpeechGenerator.TTS_VOICES),
+                    format_func=lambda x: f"{x} - {SpeechGenerator.TTS_VOICES[x]['description']}",
                 )
+                preview = tts_engine.preview(voice_type)
+                if preview:
+                    st.audio(preview)
+                else:
+                    st.caption("Voice preview is still being prepared...")
                 additional_instructions = st.text_area(
                     "Additional Instructions:",
                     placeholder="E.g., Include a personal anecdote",
                     max_chars=200,
                 )
+                auto_coach = st.checkbox(
+                    "Auto-coach until targets are met",
+                    help="Score the speech with the Presentation Coach and rewrite only the sections that miss word count, complexity or sentiment targets",
+                )
+                speculative = st.checkbox(
+                    "Speculative prefetch",
+                    help="After each speech, generate adjacent durations and the next style in the background so switching is instant",
+                )
+                prefetch_budget = st.number_input(
+                    "Prefetch token budget:",
+                    min_value=0,
+                    value=20000,
+                    step=5000,
+                    disabled=not speculative,
+                )
 
         if st.button("Generate Speech", type="primary", use_container_width=True):
             with st.spinner("Generating your speech... This may take a moment"):
                 try:
-                    speech_text, metadata = st.session_state.generator.generate_speech(
+                    generator = st.session_state.generator
+                    if speculative:
+                        if st.session_state.prefetcher is None:
+                            st.session_state.prefetcher = SpeculativePrefetcher(
+                                generator
+                            )
+                        st.session_state.prefetcher.token_budget = prefetch_budget
+                        generator = st.session_state.prefetcher
+
+                    if auto_coach:
+                        generate = SpeechQualityLoop(
+                            generator, st.session_state.coach
+                        ).run
+                    else:
+                        generate = generator.generate_speech
+                    speech_text, metadata = generate(
                         topic=topic,
                         duration=duration,
                         emotion=emotion,
@@ -189,6 +255,19 @@ if page == "📝 Speech Generator":
                     st.success(
                         f"✅ Speech generated successfully with {metadata['word_count']} words (~{duration} minutes)"
                     )
+                    if speculative:
+                        stats = st.session_state.prefetcher.stats()
+                        st.caption(
+                            f"{'⚡ Served from prefetch. ' if metadata.get('prefetched') else ''}"
+                            f"Prefetch hit rate {stats['hit_rate']:.0%}, "
+                            f"{stats['tokens_spent']}/{stats['token_budget']} tokens spent"
+                        )
+                    if "quality" in metadata and not metadata["quality"]["accepted"]:
+                        st.warning(
+                            "Targets not fully met after "
+                            f"{metadata['quality']['rounds']} rewrite rounds: "
+                            f"{', '.join(metadata['quality']['checks']['failures'])}"
+                        )
 
                 except Exception as e:
                     st.error(f"Error generating speech: {str(e)}")
@@ -236,7 +315,7 @@ if page == "📝 Speech Generator":
                 if st.session_state.last_audio:
                     st.download_button(
                         label="Download Audio",
-                        data=open(st.session_state.last_audio, "rb").read(),
+                        data=read_binary_file(st.session_state.last_audio),
                         file_name="speech_audio.mp3",
                         mime="audio/mp3",
                         use_container_width=True,
@@ -274,19 +353,36 @@ elif page == "🎯 Presentation Coach":
         placeholder="Paste your speech or draft presentation text here for analysis...",
     )
 
-    if (
-        st.button("Analyze Speech", type="primary", use_container_width=True)
-        and user_speech
+    transcript = st.file_uploader(
+        "Or upload a transcript (.txt):",
+        type=["txt"],
+        help="The transcript is analyzed in chunks, so long transcripts don't need extra working copies of the text",
+    )
+
+    if st.button("Analyze Speech", type="primary", use_container_width=True) and (
+        user_speech or transcript
     ):
         with st.spinner("Analyzing your speech..."):
             coach = st.session_state.coach
 
-            sentiment_label, confidence = coach.analyze_sentiment(user_speech)
-            structure_score, sentence_count = coach.structure_score(user_speech)
-            complexity_score = coach.analyze_complexity(user_speech)
-            suggestions = coach.suggest_improvements(
-                sentiment_label, confidence, sentence_count, complexity_score
-            )
+            if transcript is not None:
+                result = coach.analyze_stream(
+                    io.TextIOWrapper(transcript, encoding="utf-8")
+                )
+                sentiment_label, confidence = result["sentiment"]
+                structure_score = result["structure"]["score"]
+                sentence_count = result["structure"]["sentence_count"]
+                complexity_score = result["complexity"]
+                suggestions = result["suggestions"]
+                word_count = result["word_count"]
+            else:
+                sentiment_label, confidence = coach.analyze_sentiment(user_speech)
+                structure_score, sentence_count = coach.structure_score(user_speech)
+                complexity_score = coach.analyze_complexity(user_speech)
+                suggestions = coach.suggest_improvements(
+                    sentiment_label, confidence, sentence_count, complexity_score
+                )
+                word_count = len(user_speech.split())
 
             st.markdown('<div class="results-container">', unsafe_allow_html=True)
 
@@ -337,8 +433,6 @@ elif page == "🎯 Presentation Coach":
             for suggestion in suggestions:
                 st.markdown(f"- {suggestion}")
 
-            words = user_speech.split()
-            word_count = len(words)
             estimated_time = round(word_count / 130, 1)
 
             st.markdown("### Speech Statistics")
@@ -0,0 +1,150 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from benchmarks.synthetic import synthetic_speech
+
+
+class FakeGroqServer:
+    """Local stand-in for Groq's OpenAI-compatible chat completions API.
+
+    ``latency`` is the delay before the first token; ``tokens_per_second``
+    paces the streamed completion. Completions are synthetic speeches sized
+    from the "approximately N words" line of the prompt.
+    """
+
+    def __init__(
+        self,
+        latency: float = 0.2,
+        tokens_per_second: float = 500.0,
+        host: str = "127.0.0.1",
+        port: int = 0,
+    ):
+        self.latency = latency
+        self.tokens_per_second = tokens_per_second
+        self.requests = 0
+        self._server = ThreadingHTTPServer((host, port), self._handler())
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def __enter__(self):
+        self._thread = threading.Thread(
+            target=self._server.serve_forever, name="fake-groq", daemon=True
+        )
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._server.shutdown()
+        self._server.server_close()
+        return False
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_POST(self):
+                if not self.path.endswith("/chat/completions"):
+                    self.send_error(404)
+                    return
+                length = int(self.headers.get("Content-Length", 0))
+                request = json.loads(self.rfile.read(length) or b"{}")
+                server.requests += 1
+
+                prompt = request["messages"][-1]["content"]
+                words = _requested_words(prompt)
+                tokens = synthetic_speech(words, seed=server.requests).split(" ")
+                tokens = [token + " " for token in tokens[:-1]] + tokens[-1:]
+                usage = {
+                    "prompt_tokens": len(prompt.split()),
+                    "completion_tokens": len(tokens),
+                    "total_tokens": len(prompt.split()) + len(tokens),
+                }
+
+                time.sleep(server.latency)
+                if request.get("stream"):
+                    self._stream(request, tokens, usage)
+                else:
+                    self._complete(request, tokens, usage)
+
+            def _complete(self, request, tokens, usage):
+                time.sleep(len(tokens) / server.tokens_per_second)
+                body = json.dumps(
+                    {
+                        "id": "chatcmpl-bench",
+                        "object": "chat.completion",
+                        "created": int(time.time()),
+                        "model": request["model"],
+                        "choices": [
+                            {
+                                "index": 0,
+                                "message": {
+                                    "role": "assistant",
+                                    "content": "".join(tokens),
+                                },
+                                "finish_reason": "stop",
+                            }
+                        ],
+                        "usage": usage,
+                    }
+                ).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _stream(self, request, tokens, usage):
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+
+                interval = 1.0 / server.tokens_per_second
+                for i, token in enumerate(tokens):
+                    last = i == len(tokens) - 1
+                    chunk = {
+                        "id": "chatcmpl-bench",
+                        "object": "chat.completion.chunk",
+                        "created": int(time.time()),
+                        "model": request["model"],
+                        "choices": [
+                            {
+                                "index": 0,
+                                "delta": {"content": token},
+                                "finish_reason": "stop" if last else None,
+                            }
+                        ],
+                    }
+                    if last:
+                        chunk["x_groq"] = {"id": "req-bench", "usage": usage}
+                    self._write_event(json.dumps(chunk))
+                    time.sleep(interval)
+                self._write_event("[DONE]")
+                self.wfile.write(b"0\r\n\r\n")
+
+            def _write_event(self, data):
+                payload = f"data: {data}\n\n".encode("utf-8")
+                self.wfile.write(f"{len(payload):x}\r\n".encode("ascii"))
+                self.wfile.write(payload + b"\r\n")
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+
+def _requested_words(prompt: str) -> int:
+    marker = "approximately "
+    idx = prompt.find(marker)
+    if idx == -1:
+        return 300
+    digits = prompt[idx + len(marker) :].split(" ", 1)[0]
+    return int(digits) if digits.isdigit() else 300
@@ -0,0 +1,531 @@
+"""Benchmark every pipeline stage and compare against a stored baseline.
+
+Run from the repository root:
+
+    python -m benchmarks.run_benchmarks --output bench.json
+    python -m benchmarks.run_benchmarks --save-baseline
+    python -m benchmarks.run_benchmarks --baseline benchmarks/baseline.json
+    python -m benchmarks.run_benchmarks --require-baseline   # CI: no baseline is an error
+
+The process exits with status 1 when any benchmark's median is slower than
+the baseline by more than ``--threshold``, when importing ``speech_master``
+pulls in a dependency that should only load on first use, when the stage
+timers cost more than 1% of the analysis benchmark, or when the streaming
+coach's peak memory grows with the transcript size.
+"""
+
+import argparse
+import datetime
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import timeit
+import tracemalloc
+from typing import Callable, Dict, List, Optional, Tuple
+
+from benchmarks.fake_groq import FakeGroqServer
+from benchmarks.stub_tts import StubTTSEngine
+from benchmarks.synthetic import (
+    TRANSCRIPT_VARIANTS,
+    synthetic_speech,
+    synthetic_transcript,
+)
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SIZES = (1_000, 10_000, 100_000, 1_000_000)
+QUICK_SIZES = (1_000, 10_000)
+
+# Dependencies that must stay out of ``import speech_master``.
+LAZY_MODULES = ("groq", "pyttsx3", "nltk", "http.server")
+
+# Allowed growth of the streaming coach's peak memory from the smallest to the
+# largest transcript; anything proportional to the input is far above this.
+# Memory is traced with small chunks and a small buffer so even the 1k
+# transcript spans several.
+STREAM_MEMORY_GROWTH = 2.0
+STREAM_MEMORY_CHUNK = 1024
+STREAM_MEMORY_BUFFER = 4096
+
+# Stage timers must cost less than this share of the analysis benchmark.
+INSTRUMENTATION_BUDGET = 0.01
+
+# Simulated driver load time for the cold/warm first-synthesis comparison.
+STUB_LOAD_SECONDS = 0.2
+
+
+def import_profile(module: str = "speech_master") -> Tuple[float, List[str]]:
+    """Cumulative ``-X importtime`` seconds for ``module`` in a fresh process."""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=REPO_ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    cumulative = 0.0
+    imported = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        fields = [field.strip() for field in line[len("import time:") :].split("|")]
+        if len(fields) != 3 or not fields[1].isdigit():
+            continue
+        imported.append(fields[2])
+        if fields[2] == module:
+            cumulative = int(fields[1]) / 1e6
+    return cumulative, imported
+
+
+def measure(
+    func: Callable,
+    setup: Optional[Callable] = None,
+    min_time: float = 0.2,
+    min_runs: int = 3,
+    max_runs: int = 50,
+) -> Dict:
+    timings: List[float] = []
+    spent = 0.0
+    while len(timings) < min_runs or (spent < min_time and len(timings) < max_runs):
+        if setup:
+            setup()
+        started = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - started
+        timings.append(elapsed)
+        spent += elapsed
+    return {
+        "median": statistics.median(timings),
+        "min": min(timings),
+        "mean": statistics.fmean(timings),
+        "runs": len(timings),
+    }
+
+
+class BenchmarkSuite:
+    def __init__(self, sizes, llm_profiles, min_time: float = 0.2):
+        self.sizes = sizes
+        self.llm_profiles = llm_profiles
+        self.min_time = min_time
+        self.results: Dict[str, Dict] = {}
+        self.eager_imports: List[str] = []
+        self.stream_memory: Dict[str, Dict[int, int]] = {}
+        self.stream_mismatches: List[str] = []
+        self.instrumentation_overhead = 0.0
+
+    def record(self, name: str, func: Callable, **kwargs) -> Dict:
+        kwargs.setdefault("min_time", self.min_time)
+        result = measure(func, **kwargs)
+        self.results[name] = result
+        print(
+            f"{name:<58} median {result['median'] * 1000:10.3f} ms  "
+            f"min {result['min'] * 1000:10.3f} ms  ({result['runs']} runs)"
+        )
+        return result
+
+    def run(self) -> Dict[str, Dict]:
+        self.bench_import()
+
+        from speech_master import PresentationCoach, SpeechGenerator
+
+        generator = SpeechGenerator()
+        generator.tts_engine = self.stub_engine(SpeechGenerator.TTS_VOICES)
+        generator.tts_engine.warm()
+        coach = PresentationCoach()
+
+        self.bench_prompt(generator)
+        self.bench_generation(generator)
+        self.bench_tts(generator)
+        self.bench_coach(coach)
+        self.bench_stream(coach)
+        self.bench_instrumentation(coach)
+        return self.results
+
+    def bench_import(self) -> None:
+        timings = []
+        for _ in range(5):
+            seconds, imported = import_profile()
+            timings.append(seconds)
+        self.eager_imports = [
+            name
+            for name in imported
+            if any(name == lazy or name.startswith(lazy + ".") for lazy in LAZY_MODULES)
+        ]
+        self.results["import speech_master"] = {
+            "median": statistics.median(timings),
+            "min": min(timings),
+            "mean": statistics.fmean(timings),
+            "runs": len(timings),
+        }
+        print(
+            f"{'import speech_master (-X importtime)':<58} "
+            f"median {statistics.median(timings) * 1000:10.3f} ms"
+        )
+
+    def bench_prompt(self, generator) -> None:
+        self.record(
+            "build_prompt[cached]",
+            lambda: generator.build_prompt("Benchmarks", 3, "formal", "general"),
+        )
+        counter = iter(range(10**9))
+        self.record(
+            "build_prompt[uncached]",
+            lambda: generator.build_prompt(
+                f"Benchmarks {next(counter)}", 3, "formal", "general"
+            ),
+        )
+
+    def bench_generation(self, generator) -> None:
+        try:
+            from groq import Groq
+        except ImportError:
+            print("Skipping generate_speech benchmarks: groq is not installed")
+            return
+
+        for latency, tokens_per_second in self.llm_profiles:
+            with FakeGroqServer(latency, tokens_per_second) as server:
+                generator.client = Groq(api_key="benchmark", base_url=server.base_url)
+                self.record(
+                    f"generate_speech[latency={latency}s,tps={tokens_per_second:g}]",
+                    lambda: generator.generate_speech(
+                        "Benchmarks", 1, "formal", "general"
+                    ),
+                    min_time=0,
+                    min_runs=3,
+                )
+        generator.client = None
+
+    def bench_tts(self, generator) -> None:
+        for size in self.sizes[:3]:
+            text = synthetic_speech(size)
+            self.record(
+                f"prepare_text_for_tts[{size} words]",
+                lambda: generator.prepare_text_for_tts(text),
+            )
+
+        text = synthetic_speech(1_000)
+
+        def synthesize():
+            os.remove(generator.generate_speech_audio(text, voice="female"))
+
+        self.record("generate_speech_audio[1000 words, stub driver]", synthesize)
+
+        # The first "Generate Audio" after start-up, with and without warming.
+        def fresh_engine(warm: bool):
+            def setup():
+                generator.tts_engine.stop()
+                generator.tts_engine = self.stub_engine(
+                    generator.TTS_VOICES, load_seconds=STUB_LOAD_SECONDS
+                )
+                if warm:
+                    generator.tts_engine.warm()
+
+            return setup
+
+        for warm in (False, True):
+            self.record(
+                f"generate_speech_audio[first call, {'warmed' if warm else 'cold'} engine]",
+                synthesize,
+                setup=fresh_engine(warm),
+                min_time=0,
+                min_runs=3,
+            )
+
+    @staticmethod
+    def stub_engine(voices, load_seconds: float = 0.0):
+        from tts_engine import TTSEngineWorker
+
+        return TTSEngineWorker(
+            voices,
+            preview_folder=os.path.join("speech_outputs", "audio", "previews"),
+            engine_factory=lambda: StubTTSEngine(load_seconds=load_seconds),
+        )
+
+    def bench_coach(self, coach) -> None:
+        from speech_structure import get_span_index
+
+        for size in self.sizes:
+            text = synthetic_speech(size)
+            runs = {"max_runs": 50 if size < 100_000 else 5}
+            self.record(
+                f"coach.analyze_sentiment[{size} words]",
+                lambda: coach.analyze_sentiment(text),
+                **runs,
+            )
+            self.record(
+                f"coach.structure_score[{size} words]",
+                lambda: coach.structure_score(text),
+                setup=get_span_index.cache_clear,
+                **runs,
+            )
+            self.record(
+                f"coach.analyze_complexity[{size} words]",
+                lambda: coach.analyze_complexity(text),
+                **runs,
+            )
+            self.record(
+                f"coach.suggest_improvements[{size} words]",
+                lambda: coach.suggest_improvements("POSITIVE", 70.0, 12, 55.0),
+                **runs,
+            )
+
+    def bench_stream(self, coach) -> None:
+        """Time ``analyze_stream`` and check its peak memory stays flat.
+
+        Unpunctuated transcripts (raw speech-to-text output) have no sentence
+        ends to cut at, and a stray ``*`` or ``[`` on a long line must not
+        stop the cuts, so both are checked separately.
+        """
+        for variant in TRANSCRIPT_VARIANTS:
+            self.stream_memory[variant] = {}
+            for size in self.sizes:
+                self._bench_stream(coach, variant, size)
+
+    def _bench_stream(self, coach, variant: str, size: int) -> None:
+        path = f"transcript-{variant}-{size}.txt"
+        text = synthetic_transcript(size, variant)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(text)
+
+        if size <= 100_000:
+            label, confidence = coach.analyze_sentiment(text)
+            expected = {
+                "sentiment": (label, confidence),
+                "structure": coach.analyze_structure(text),
+                "complexity": coach.analyze_complexity(text),
+            }
+            result = coach.analyze_stream(path)
+            if any(result[key] != value for key, value in expected.items()):
+                self.stream_mismatches.append(f"{size} {variant} words")
+        del text
+
+        suffix = "" if variant == "punctuated" else f", {variant}"
+        self.record(
+            f"coach.analyze_stream[{size} words{suffix}]",
+            lambda: coach.analyze_stream(path),
+            max_runs=50 if size < 100_000 else 3,
+        )
+
+        tracemalloc.start()
+        coach.analyze_stream(
+            path, chunk_size=STREAM_MEMORY_CHUNK, max_buffer=STREAM_MEMORY_BUFFER
+        )
+        peak = self.stream_memory[variant][size] = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        os.remove(path)
+        print(
+            f"{f'coach.analyze_stream[{size} words{suffix}] peak memory':<58} "
+            f"{peak / 1024:10.1f} KiB"
+        )
+
+    def stream_memory_growth(self) -> Dict[str, float]:
+        growth = {}
+        for variant, peaks in self.stream_memory.items():
+            sizes = sorted(peaks)
+            growth[variant] = peaks[sizes[-1]] / peaks[sizes[0]]
+        return growth
+
+    def bench_instrumentation(self, coach) -> None:
+        """Per-call cost of the stage timers relative to the analysis they time.
+
+        Timing the instrumented and undecorated coach against each other is
+        dominated by run-to-run noise, so the timer cost is measured on its
+        own over many calls and compared with the undecorated analysis.
+        """
+        from metrics import timed_stage
+        from speech_structure import get_span_index
+
+        text = synthetic_speech(10_000)
+        methods = ("analyze_sentiment", "analyze_structure", "analyze_complexity")
+
+        def analysis():
+            get_span_index.cache_clear()
+            for name in methods:
+                getattr(type(coach), name).__wrapped__(coach, text)
+
+        raw = self.record("coach.analysis[10000 words, uninstrumented]", analysis)
+
+        def noop():
+            pass
+
+        instrumented = timed_stage("benchmark_overhead")(noop)
+        calls = 100_000
+        bare = min(timeit.repeat(noop, number=calls, repeat=5)) / calls
+        wrapped = min(timeit.repeat(instrumented, number=calls, repeat=5)) / calls
+        per_call = max(wrapped - bare, 0.0)
+
+        self.instrumentation_overhead = per_call * len(methods) / raw["median"]
+        self.results["stage timer per call"] = {
+            "median": per_call,
+            "min": per_call,
+            "mean": per_call,
+            "runs": calls,
+        }
+        print(
+            f"{'stage timer per call':<58} {per_call * 1e6:10.3f} us  "
+            f"({self.instrumentation_overhead:.4%} of the analysis)"
+        )
+
+
+def compare(results: Dict, baseline: Dict, threshold: float) -> List[str]:
+    regressions = []
+    for name, result in results.items():
+        base = baseline.get(name)
+        if not base:
+            continue
+        ratio = result["median"] / base["median"]
+        if ratio > 1 + threshold:
+            regressions.append(
+                f"{name}: {base['median'] * 1000:.3f} ms -> "
+                f"{result['median'] * 1000:.3f} ms ({(ratio - 1) * 100:+.1f}%)"
+            )
+    return regressions
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--output", help="Write results as JSON to this path")
+    parser.add_argument(
+        "--baseline",
+        default=DEFAULT_BASELINE,
+        help="Baseline JSON to compare against (default: benchmarks/baseline.json)",
+    )
+    parser.add_argument(
+        "--save-baseline",
+        action="store_true",
+        help="Store this run as the new baseline instead of comparing",
+    )
+    parser.add_argument(
+        "--require-baseline",
+        action="store_true",
+        help="Fail when the baseline file is missing (use in CI)",
+    )
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.25,
+        help="Allowed median slowdown before failing (default: 0.25 = 25%%)",
+    )
+    parser.add_argument(
+        "--quick", action="store_true", help="Only 1k and 10k word transcripts"
+    )
+    parser.add_argument(
+        "--sizes",
+        help="Comma-separated transcript sizes in words (default: 1k,10k,100k,1M)",
+    )
+    parser.add_argument(
+        "--llm-latency",
+        default="0.05,0.25",
+        help="Comma-separated fake Groq time-to-first-token values in seconds",
+    )
+    parser.add_argument(
+        "--llm-tps",
+        default="1000",
+        help="Comma-separated fake Groq stream rates in tokens per second",
+    )
+    parser.add_argument("--min-time", type=float, default=0.2)
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    if args.sizes:
+        sizes = tuple(int(size) for size in args.sizes.split(","))
+    else:
+        sizes = QUICK_SIZES if args.quick else SIZES
+    llm_profiles = [
+        (float(latency), float(tps))
+        for latency in args.llm_latency.split(",")
+        for tps in args.llm_tps.split(",")
+    ]
+
+    output = os.path.abspath(args.output) if args.output else None
+    baseline_path = os.path.abspath(args.baseline)
+
+    # SpeechGenerator writes into ./speech_outputs; keep that out of the tree.
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as workdir:
+        os.chdir(workdir)
+        try:
+            suite = BenchmarkSuite(sizes, llm_profiles, args.min_time)
+            results = suite.run()
+        finally:
+            os.chdir(cwd)
+
+    report = {
+        "meta": {
+            "timestamp": datetime.datetime.now().isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "sizes": list(sizes),
+        },
+        "results": results,
+        "stream_peak_bytes": suite.stream_memory,
+    }
+
+    if output:
+        with open(output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+    if suite.eager_imports:
+        print(
+            "\nIMPORT REGRESSION: importing speech_master loads "
+            f"{', '.join(suite.eager_imports)}; these must be imported on first use."
+        )
+        return 1
+
+    if suite.instrumentation_overhead > INSTRUMENTATION_BUDGET:
+        print(
+            f"\nINSTRUMENTATION OVERHEAD: stage timers cost "
+            f"{suite.instrumentation_overhead:.2%} of the analysis benchmark "
+            f"(allowed {INSTRUMENTATION_BUDGET:.0%})."
+        )
+        return 1
+
+    if suite.stream_mismatches:
+        print(
+            "\nSTREAMING MISMATCH: analyze_stream scores differ from the in-memory "
+            f"coach for {', '.join(suite.stream_mismatches)}."
+        )
+        return 1
+
+    for variant, growth in suite.stream_memory_growth().items():
+        if growth > STREAM_MEMORY_GROWTH:
+            print(
+                f"\nMEMORY REGRESSION: analyze_stream peak memory on {variant} "
+                f"transcripts grew {growth:.2f}x from {min(sizes)} to {max(sizes)} "
+                f"words (allowed {STREAM_MEMORY_GROWTH}x)."
+            )
+            return 1
+
+    if args.save_baseline:
+        with open(baseline_path, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"Baseline saved to {baseline_path}")
+        return 0
+
+    if not os.path.exists(baseline_path):
+        print(f"No baseline at {baseline_path}; run with --save-baseline first.")
+        return 1 if args.require_baseline else 0
+
+    with open(baseline_path, "r", encoding="utf-8") as f:
+        baseline = json.load(f)["results"]
+
+    regressions = compare(results, baseline, args.threshold)
+    if regressions:
+        print(f"\nPERFORMANCE REGRESSION (> {args.threshold:.0%} slower than baseline):")
+        for line in regressions:
+            print(f"  {line}")
+        return 1
+
+    print(f"\nNo regressions against {baseline_path}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,48 @@
+import time
+
+
+class StubVoice:
+    def __init__(self, voice_id: str, name: str):
+        self.id = voice_id
+        self.name = name
+
+
+class StubTTSEngine:
+    """Drop-in for a pyttsx3 engine that writes placeholder audio.
+
+    ``seconds_per_char`` simulates synthesis cost so the harness measures
+    the pipeline around the driver rather than the driver itself;
+    ``load_seconds`` simulates loading the driver when the engine is created.
+    """
+
+    def __init__(self, seconds_per_char: float = 0.0, load_seconds: float = 0.0):
+        if load_seconds:
+            time.sleep(load_seconds)
+        self.seconds_per_char = seconds_per_char
+        self.properties = {
+            "rate": 200,
+            "volume": 1.0,
+            "voices": [StubVoice("stub-male", "Male"), StubVoice("stub-female", "Female")],
+        }
+        self.properties["voice"] = self.properties["voices"][0].id
+        self._queue = []
+
+    def getProperty(self, name):
+        return self.properties[name]
+
+    def setProperty(self, name, value):
+        self.properties[name] = value
+
+    def save_to_file(self, text, path):
+        self._queue.append((text, path))
+
+    def runAndWait(self):
+        queue, self._queue = self._queue, []
+        for text, path in queue:
+            if self.seconds_per_char:
+                time.sleep(len(text) * self.seconds_per_char)
+            with open(path, "wb") as f:
+                f.write(b"\0" * (len(text) * 2))
+
+    def stop(self):
+        self._queue = []
@@ -0,0 +1,80 @@
+import random
+import re
+
+VOCABULARY = (
+    "the audience learning students teachers technology future classroom "
+    "change ideas people community growth challenge opportunity success "
+    "problem solution together practice progress great difficult better "
+    "research evidence example story moment question answer important "
+    "powerful simple remarkable everyday experience knowledge curiosity "
+    "responsibility innovation collaboration understanding"
+).split()
+
+TRANSITIONS = (
+    "First,",
+    "Next,",
+    "However,",
+    "Moreover,",
+    "For example,",
+    "As a result,",
+    "Now",
+    "Finally,",
+)
+
+NOTES = ("[slow down]", "[look at the audience]", "[smile]", "[gesture broadly]")
+
+
+def synthetic_speech(words: int, seed: int = 0) -> str:
+    """A deterministic speech of ``words`` words using the prompt markup.
+
+    Paragraphs, transitions, ``[pause]`` markers, ``*emphasis*`` spans and
+    bracketed delivery notes appear at roughly the rates a model produces.
+    """
+    rng = random.Random(seed)
+    paragraphs = []
+    sentences = []
+    produced = 0
+
+    while produced < words:
+        length = min(rng.randint(8, 20), words - produced)
+        sentence = rng.choices(VOCABULARY, k=length)
+        if rng.random() < 0.3:
+            sentence[0] = rng.choice(TRANSITIONS)
+        else:
+            sentence[0] = sentence[0].capitalize()
+        if length > 3 and rng.random() < 0.2:
+            i = rng.randrange(1, length - 1)
+            sentence[i] = f"*{sentence[i]}*"
+        text = " ".join(sentence) + rng.choice(".....!?")
+        if rng.random() < 0.15:
+            text += " [pause]"
+        if rng.random() < 0.05:
+            text = rng.choice(NOTES) + " " + text
+        sentences.append(text)
+        produced += length
+
+        if len(sentences) >= rng.randint(4, 8):
+            paragraphs.append(" ".join(sentences))
+            sentences = []
+
+    if sentences:
+        paragraphs.append(" ".join(sentences))
+    return "\n\n".join(paragraphs)
+
+
+TRANSCRIPT_VARIANTS = ("punctuated", "unpunctuated", "unbalanced")
+
+
+def synthetic_transcript(words: int, variant: str = "punctuated", seed: int = 0) -> str:
+    """``synthetic_speech`` shaped like an uploaded transcript.
+
+    ``unpunctuated`` drops sentence ends and line breaks, like raw
+    speech-to-text output. ``unbalanced`` is a single line that opens with a
+    ``*`` and a ``[`` that are never closed.
+    """
+    text = synthetic_speech(words, seed)
+    if variant == "unpunctuated":
+        return re.sub(r"[.!?]", "", text).replace("\n", " ")
+    if variant == "unbalanced":
+        return "Rated 5 * 3 stars, see [ref " + text.replace("\n", " ")
+    return text
@@ -0,0 +1,471 @@
+"""Durable generate -> normalize -> synthesize -> encode job queue.
+
+Jobs and per-stage checkpoints live in SQLite, so workers in any number of
+processes can pull jobs, and a crashed or restarted worker resumes from the
+last completed stage instead of re-spending tokens or CPU.
+
+    python job_queue.py enqueue --topic "AI in Education" --duration 3
+    python job_queue.py enqueue-batch overnight.jsonl
+    python job_queue.py worker
+    python job_queue.py status
+    python job_queue.py retry
+"""
+
+import argparse
+import hashlib
+import json
+import logging
+import os
+import shutil
+import socket
+import sqlite3
+import subprocess
+import sys
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Dict, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DB_PATH = os.path.join("speech_outputs", "jobs.sqlite3")
+DEFAULT_JOBS_FOLDER = os.path.join("speech_outputs", "jobs")
+
+STAGES = ("generate", "normalize", "synthesize", "encode")
+
+PENDING = "pending"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+JOB_DEFAULTS = {
+    "emotion": "formal",
+    "audience": "general",
+    "model": "llama3-8b-8192",
+    "temperature": 0.7,
+    "additional_instructions": "",
+    "voice": "male",
+}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    params TEXT NOT NULL,
+    status TEXT NOT NULL,
+    stage TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL,
+    available_at REAL NOT NULL,
+    lease_owner TEXT,
+    lease_expires REAL,
+    error TEXT,
+    result TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS jobs_ready ON jobs (status, available_at);
+CREATE TABLE IF NOT EXISTS checkpoints (
+    job_id TEXT NOT NULL,
+    stage TEXT NOT NULL,
+    output TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    PRIMARY KEY (job_id, stage)
+);
+"""
+
+
+class LeaseLost(Exception):
+    pass
+
+
+class JobQueue:
+    def __init__(self, db_path: str = DEFAULT_DB_PATH):
+        self.db_path = db_path
+        folder = os.path.dirname(db_path)
+        if folder and not os.path.exists(folder):
+            os.makedirs(folder)
+
+        with self._connection() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA busy_timeout=30000")
+        return conn
+
+    @contextmanager
+    def _connection(self):
+        conn = self._connect()
+        try:
+            yield conn
+        except Exception:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+    @staticmethod
+    def job_id(params: Dict) -> str:
+        canonical = json.dumps(params, sort_keys=True, separators=(",", ":"))
+        return hashlib.sha256(canonical.encode("utf-8")).hexdigest()[:16]
+
+    def enqueue(self, params: Dict, max_attempts: int = 3, dedupe: bool = True) -> str:
+        """Add a job; identical params map to the same job unless ``dedupe`` is off."""
+        if "topic" not in params or "duration" not in params:
+            raise ValueError("Jobs need at least a topic and a duration")
+
+        params = dict(JOB_DEFAULTS, **params)
+        job_id = self.job_id(params) if dedupe else uuid.uuid4().hex[:16]
+        now = time.time()
+        with self._connection() as conn:
+            conn.execute(
+                "INSERT OR IGNORE INTO jobs (id, params, status, max_attempts, "
+                "available_at, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (job_id, json.dumps(params), PENDING, max_attempts, now, now, now),
+            )
+        return job_id
+
+    def claim(self, worker_id: str, lease_seconds: float) -> Optional[sqlite3.Row]:
+        with self._connection() as conn:
+            while True:
+                now = time.time()
+                conn.execute("BEGIN IMMEDIATE")
+                # Running jobs whose lease expired belong to a worker that died.
+                row = conn.execute(
+                    "SELECT * FROM jobs WHERE (status = ? AND available_at <= ?) "
+                    "OR (status = ? AND lease_expires < ?) ORDER BY created_at LIMIT 1",
+                    (PENDING, now, RUNNING, now),
+                ).fetchone()
+                if row is None:
+                    conn.execute("COMMIT")
+                    return None
+
+                if row["attempts"] >= row["max_attempts"]:
+                    conn.execute(
+                        "UPDATE jobs SET status = ?, lease_owner = NULL, error = ?, "
+                        "updated_at = ? WHERE id = ?",
+                        (FAILED, row["error"] or "lease expired", now, row["id"]),
+                    )
+                    conn.execute("COMMIT")
+                    continue
+
+                conn.execute(
+                    "UPDATE jobs SET status = ?, lease_owner = ?, lease_expires = ?, "
+                    "attempts = attempts + 1, updated_at = ? WHERE id = ?",
+                    (RUNNING, worker_id, now + lease_seconds, now, row["id"]),
+                )
+                conn.execute("COMMIT")
+                return conn.execute(
+                    "SELECT * FROM jobs WHERE id = ?", (row["id"],)
+                ).fetchone()
+
+    def checkpoints(self, job_id: str) -> Dict[str, Dict]:
+        with self._connection() as conn:
+            rows = conn.execute(
+                "SELECT stage, output FROM checkpoints WHERE job_id = ?", (job_id,)
+            ).fetchall()
+        return {row["stage"]: json.loads(row["output"]) for row in rows}
+
+    def checkpoint(
+        self, job_id: str, worker_id: str, stage: str, output: Dict, lease_seconds: float
+    ) -> None:
+        """Record a finished stage and extend the lease, if we still hold it."""
+        now = time.time()
+        with self._connection() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            updated = conn.execute(
+                "UPDATE jobs SET stage = ?, lease_expires = ?, updated_at = ? "
+                "WHERE id = ? AND lease_owner = ? AND status = ?",
+                (stage, now + lease_seconds, now, job_id, worker_id, RUNNING),
+            ).rowcount
+            if not updated:
+                conn.execute("ROLLBACK")
+                raise LeaseLost(f"Job {job_id} is no longer leased by {worker_id}")
+            conn.execute(
+                "INSERT OR REPLACE INTO checkpoints (job_id, stage, output, created_at) "
+                "VALUES (?, ?, ?, ?)",
+                (job_id, stage, json.dumps(output), now),
+            )
+            conn.execute("COMMIT")
+
+    def complete(self, job_id: str, worker_id: str, result: Dict) -> None:
+        with self._connection() as conn:
+            conn.execute(
+                "UPDATE jobs SET status = ?, result = ?, lease_owner = NULL, "
+                "error = NULL, updated_at = ? WHERE id = ? AND lease_owner = ?",
+                (DONE, json.dumps(result), time.time(), job_id, worker_id),
+            )
+
+    def fail(self, job_id: str, worker_id: str, error: str, backoff: float) -> str:
+        now = time.time()
+        with self._connection() as conn:
+            row = conn.execute(
+                "SELECT attempts, max_attempts FROM jobs WHERE id = ?", (job_id,)
+            ).fetchone()
+            status = FAILED if row["attempts"] >= row["max_attempts"] else PENDING
+            conn.execute(
+                "UPDATE jobs SET status = ?, error = ?, lease_owner = NULL, "
+                "available_at = ?, updated_at = ? WHERE id = ? AND lease_owner = ?",
+                (status, error, now + backoff, now, job_id, worker_id),
+            )
+        return status
+
+    def retry(self, job_id: Optional[str] = None) -> int:
+        """Put failed jobs back in the queue; finished stages are kept."""
+        now = time.time()
+        query = (
+            "UPDATE jobs SET status = ?, attempts = 0, available_at = ?, "
+            "updated_at = ? WHERE status = ?"
+        )
+        args = [PENDING, now, now, FAILED]
+        if job_id:
+            query += " AND id = ?"
+            args.append(job_id)
+        with self._connection() as conn:
+            return conn.execute(query, args).rowcount
+
+    def get(self, job_id: str) -> Optional[sqlite3.Row]:
+        with self._connection() as conn:
+            return conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+
+    def jobs(self, status: Optional[str] = None) -> List[sqlite3.Row]:
+        with self._connection() as conn:
+            if status:
+                return conn.execute(
+                    "SELECT * FROM jobs WHERE status = ? ORDER BY created_at", (status,)
+                ).fetchall()
+            return conn.execute("SELECT * FROM jobs ORDER BY created_at").fetchall()
+
+    def counts(self) -> Dict[str, int]:
+        with self._connection() as conn:
+            rows = conn.execute(
+                "SELECT status, COUNT(*) AS n FROM jobs GROUP BY status"
+            ).fetchall()
+        return {row["status"]: row["n"] for row in rows}
+
+
+def _write_atomic(path: str, data: str) -> None:
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+class JobWorker:
+    """Runs queued jobs stage by stage, skipping stages already checkpointed.
+
+    Every stage writes its output under ``jobs_folder/<job id>/`` atomically
+    before the checkpoint is committed, so re-running a stage after a crash
+    simply overwrites a partial file.
+    """
+
+    def __init__(
+        self,
+        queue: JobQueue,
+        generator,
+        jobs_folder: str = DEFAULT_JOBS_FOLDER,
+        worker_id: Optional[str] = None,
+        lease_seconds: float = 900.0,
+        retry_backoff: float = 30.0,
+    ):
+        self.queue = queue
+        self.generator = generator
+        self.jobs_folder = jobs_folder
+        self.worker_id = worker_id or (
+            f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+        )
+        self.lease_seconds = lease_seconds
+        self.retry_backoff = retry_backoff
+
+    def run(self, stop_when_idle: bool = False, poll_interval: float = 2.0) -> int:
+        # Warm the TTS engines while the first job is generating its text.
+        self.generator.tts_engine.start()
+        processed = 0
+        while True:
+            job = self.queue.claim(self.worker_id, self.lease_seconds)
+            if job is None:
+                if stop_when_idle:
+                    return processed
+                time.sleep(poll_interval)
+                continue
+            self.run_job(job)
+            processed += 1
+
+    def run_job(self, job) -> None:
+        job_id = job["id"]
+        params = json.loads(job["params"])
+        folder = os.path.join(self.jobs_folder, job_id)
+        os.makedirs(folder, exist_ok=True)
+
+        done = self.queue.checkpoints(job_id)
+        logger.info(
+            f"Worker {self.worker_id} running job {job_id} "
+            f"(attempt {job['attempts']}, resuming after {job['stage'] or 'start'})"
+        )
+
+        try:
+            for stage in STAGES:
+                if stage in done:
+                    continue
+                output = getattr(self, f"_{stage}")(params, folder, done)
+                self.queue.checkpoint(
+                    job_id, self.worker_id, stage, output, self.lease_seconds
+                )
+                done[stage] = output
+
+            self.queue.complete(job_id, self.worker_id, done["encode"])
+            logger.info(f"Job {job_id} done: {done['encode']['audio_path']}")
+
+        except LeaseLost as e:
+            logger.warning(str(e))
+
+        except Exception as e:
+            backoff = self.retry_backoff * 2 ** (job["attempts"] - 1)
+            status = self.queue.fail(job_id, self.worker_id, str(e), backoff)
+            logger.error(f"Job {job_id} failed ({status}): {str(e)}")
+
+    def _generate(self, params: Dict, folder: str, done: Dict) -> Dict:
+        from llm_scheduler import BATCH
+
+        path = os.path.join(folder, "speech.txt")
+        metadata_path = os.path.join(folder, "speech.json")
+        if os.path.exists(path) and os.path.exists(metadata_path):
+            # Generated before a crash but never checkpointed: don't pay twice.
+            with open(metadata_path, "r", encoding="utf-8") as f:
+                return {"text_path": path, "metadata": json.load(f)}
+
+        speech, metadata = self.generator.generate_speech(
+            topic=params["topic"],
+            duration=params["duration"],
+            emotion=params["emotion"],
+            audience=params["audience"],
+            model=params["model"],
+            temperature=params["temperature"],
+            additional_instructions=params["additional_instructions"],
+            priority=BATCH,
+            # Metadata is kept in the job folder; a long-running worker must
+            # not also grow the generator's in-memory history per job.
+            record_history=False,
+        )
+        _write_atomic(path, speech)
+        _write_atomic(metadata_path, json.dumps(metadata))
+        return {"text_path": path, "metadata": metadata}
+
+    def _normalize(self, params: Dict, folder: str, done: Dict) -> Dict:
+        with open(done["generate"]["text_path"], "r", encoding="utf-8") as f:
+            speech = f.read()
+        path = os.path.join(folder, "speech.tts.txt")
+        _write_atomic(path, self.generator.prepare_text_for_tts(speech))
+        return {"text_path": path}
+
+    def _synthesize(self, params: Dict, folder: str, done: Dict) -> Dict:
+        with open(done["normalize"]["text_path"], "r", encoding="utf-8") as f:
+            clean_text = f.read()
+        path = os.path.join(folder, "speech.wav")
+        tmp_path = os.path.join(folder, "speech.partial.wav")
+        self.generator.synthesize(clean_text, params["voice"], tmp_path)
+        os.replace(tmp_path, path)
+        return {"audio_path": path}
+
+    def _encode(self, params: Dict, folder: str, done: Dict) -> Dict:
+        source = done["synthesize"]["audio_path"]
+        ffmpeg = shutil.which("ffmpeg")
+        if not ffmpeg:
+            # Without ffmpeg the synthesized file is the deliverable.
+            return {"audio_path": source, "format": "wav"}
+
+        path = os.path.join(folder, "speech.mp3")
+        tmp_path = os.path.join(folder, "speech.partial.mp3")
+        subprocess.run(
+            [ffmpeg, "-y", "-loglevel", "error", "-i", source]
+            + ["-codec:a", "libmp3lame", "-q:a", "4", tmp_path],
+            check=True,
+        )
+        os.replace(tmp_path, path)
+        return {"audio_path": path, "format": "mp3"}
+
+
+def _read_batch(path: str) -> Iterable[Dict]:
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Speech production job queue")
+    parser.add_argument("--db", default=DEFAULT_DB_PATH)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    enqueue = commands.add_parser("enqueue", help="Queue one speech")
+    enqueue.add_argument("--topic", required=True)
+    enqueue.add_argument("--duration", type=int, required=True)
+    enqueue.add_argument("--style", dest="emotion", default=JOB_DEFAULTS["emotion"])
+    enqueue.add_argument("--audience", default=JOB_DEFAULTS["audience"])
+    enqueue.add_argument("--model", default=JOB_DEFAULTS["model"])
+    enqueue.add_argument("--temperature", type=float, default=JOB_DEFAULTS["temperature"])
+    enqueue.add_argument("--instructions", dest="additional_instructions", default="")
+    enqueue.add_argument("--voice", default=JOB_DEFAULTS["voice"])
+
+    batch = commands.add_parser("enqueue-batch", help="Queue one speech per JSON line")
+    batch.add_argument("path")
+
+    worker = commands.add_parser("worker", help="Process jobs until interrupted")
+    worker.add_argument("--once", action="store_true", help="Exit when the queue is empty")
+
+    retry = commands.add_parser("retry", help="Re-queue failed jobs")
+    retry.add_argument("job_id", nargs="?")
+
+    status = commands.add_parser("status", help="Show job counts or one job")
+    status.add_argument("job_id", nargs="?")
+
+    args = parser.parse_args(argv)
+    queue = JobQueue(args.db)
+
+    if args.command == "enqueue":
+        params = {
+            key: getattr(args, key)
+            for key in ("topic", "duration", *JOB_DEFAULTS)
+        }
+        print(queue.enqueue(params))
+
+    elif args.command == "enqueue-batch":
+        for params in _read_batch(args.path):
+            print(queue.enqueue(params))
+
+    elif args.command == "worker":
+        api_key = os.environ.get("GROQ_API_KEY")
+        if not api_key:
+            print("Set GROQ_API_KEY before starting a worker.", file=sys.stderr)
+            return 1
+
+        from speech_master import SpeechGenerator
+
+        generator = SpeechGenerator(api_key, session_id="job-worker")
+        processed = JobWorker(queue, generator).run(stop_when_idle=args.once)
+        print(f"Processed {processed} jobs")
+
+    elif args.command == "retry":
+        print(f"Re-queued {queue.retry(args.job_id)} jobs")
+
+    elif args.command == "status":
+        if args.job_id:
+            job = queue.get(args.job_id)
+            if job is None:
+                print(f"No job {args.job_id}", file=sys.stderr)
+                return 1
+            print(json.dumps(dict(job), indent=2))
+        else:
+            print(json.dumps(queue.counts(), indent=2))
+
+    return 0
+
+
+if __name__ == "__main__":
+    logging.basicConfig(
+        level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
+    )
+    sys.exit(main())
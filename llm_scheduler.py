@@ -0,0 +1,349 @@
+import hashlib
+import logging
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple
+
+from metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+INTERACTIVE = "interactive"
+BATCH = "batch"
+PRIORITIES = (INTERACTIVE, BATCH)
+
+QUEUE_DEPTH = REGISTRY.gauge(
+    "speech_master_llm_queue_depth",
+    "LLM requests waiting in the scheduler.",
+    labelnames=("priority",),
+)
+QUEUE_WAIT_SECONDS = REGISTRY.histogram(
+    "speech_master_llm_queue_wait_seconds",
+    "Time LLM requests spent queued before dispatch.",
+    labelnames=("priority",),
+)
+DISPATCHED = REGISTRY.counter(
+    "speech_master_llm_dispatched_total",
+    "LLM requests dispatched by the scheduler.",
+    labelnames=("model", "priority"),
+)
+RATE_LIMITED = REGISTRY.counter(
+    "speech_master_llm_rate_limited_total",
+    "LLM requests the provider rejected with HTTP 429.",
+    labelnames=("model",),
+)
+
+
+def key_id(api_key: Optional[str]) -> str:
+    # Buckets and logs are keyed by a digest so raw API keys are never kept.
+    if not api_key:
+        return "anonymous"
+    return hashlib.sha256(api_key.encode("utf-8")).hexdigest()[:12]
+
+
+class TokenBucket:
+    def __init__(self, per_minute: float):
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        self._refill(now)
+        amount = min(amount, self.capacity)
+        if self.tokens >= amount:
+            return 0.0
+        return (amount - self.tokens) / self.rate
+
+    def take(self, amount: float, now: float) -> None:
+        self._refill(now)
+        self.tokens -= min(amount, self.capacity)
+
+    def adjust(self, delta: float) -> None:
+        self.tokens = min(self.capacity, self.tokens - delta)
+
+    def pause(self, seconds: float, now: float) -> None:
+        self._refill(now)
+        self.tokens = min(self.tokens, 0.0) - seconds * self.rate
+
+
+class _Request:
+    __slots__ = (
+        "fn",
+        "key",
+        "model",
+        "session_id",
+        "priority",
+        "tokens",
+        "future",
+        "enqueued_at",
+        "attempts",
+    )
+
+    def __init__(self, fn, key, model, session_id, priority, tokens):
+        self.fn = fn
+        self.key = key
+        self.model = model
+        self.session_id = session_id
+        self.priority = priority
+        self.tokens = tokens
+        self.future = Future()
+        self.enqueued_at = time.monotonic()
+        self.attempts = 0
+
+
+class LLMScheduler:
+    """Fair, rate-limited dispatch of LLM calls shared by every session.
+
+    Requests are limited by token buckets per API key (requests per minute)
+    and per key and model (requests and tokens per minute). Sessions are
+    served round-robin and interactive work goes ahead of batch work. Batch
+    work that has waited ``batch_max_wait`` seconds is promoted for one
+    dispatch after every ``interactive_per_aged_batch`` interactive ones, so
+    batch is never starved and an aged backlog cannot hold interactive work
+    back either. A request blocked on a bucket reserves it, so lower-priority
+    requests cannot jump ahead on the same limit.
+    """
+
+    def __init__(
+        self,
+        model_limits: Optional[Dict[str, Dict]] = None,
+        key_requests_per_minute: Optional[float] = None,
+        max_concurrency: int = 8,
+        batch_max_wait: float = 30.0,
+        max_retries: int = 2,
+        interactive_per_aged_batch: int = 3,
+    ):
+        self.model_limits = model_limits or {}
+        self.key_requests_per_minute = key_requests_per_minute
+        self.max_concurrency = max_concurrency
+        self.batch_max_wait = batch_max_wait
+        self.max_retries = max_retries
+        self.interactive_per_aged_batch = interactive_per_aged_batch
+
+        self._queues: Dict[str, "OrderedDict[str, deque]"] = {
+            priority: OrderedDict() for priority in PRIORITIES
+        }
+        self._buckets: Dict[Tuple, TokenBucket] = {}
+        self._cond = threading.Condition()
+        self._inflight = 0
+        # Interactive dispatches since batch work last went out.
+        self._interactive_streak = 0
+        self._executor = None
+        self._dispatcher = None
+
+    def submit(
+        self,
+        fn: Callable,
+        *,
+        api_key: Optional[str],
+        model: str,
+        session_id: str = "default",
+        priority: str = INTERACTIVE,
+        tokens: int = 0,
+    ) -> Future:
+        if priority not in PRIORITIES:
+            raise ValueError(f"Unknown priority: {priority}")
+
+        request = _Request(fn, key_id(api_key), model, session_id, priority, tokens)
+        with self._cond:
+            self._start()
+            self._queues[priority].setdefault(session_id, deque()).append(request)
+            QUEUE_DEPTH.inc(priority=priority)
+            self._cond.notify_all()
+        return request.future
+
+    def call(self, fn: Callable, **kwargs):
+        return self.submit(fn, **kwargs).result()
+
+    def settle(self, api_key: Optional[str], model: str, estimated: int, actual: int) -> None:
+        """Correct the token bucket once the provider reports real usage."""
+        with self._cond:
+            bucket = self._buckets.get(("tokens", key_id(api_key), model))
+            if bucket is not None:
+                bucket.adjust(actual - estimated)
+
+    def queue_depth(self) -> Dict[str, int]:
+        with self._cond:
+            return {
+                priority: sum(len(q) for q in queue.values())
+                for priority, queue in self._queues.items()
+            }
+
+    def _start(self) -> None:
+        if self._dispatcher is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.max_concurrency, thread_name_prefix="llm"
+            )
+            self._dispatcher = threading.Thread(
+                target=self._dispatch_loop, name="llm-scheduler", daemon=True
+            )
+            self._dispatcher.start()
+
+    def _limits(self, request: _Request) -> List[Tuple[Tuple, float, float]]:
+        limits = []
+        if self.key_requests_per_minute:
+            limits.append((("key", request.key), self.key_requests_per_minute, 1))
+        model = self.model_limits.get(request.model, {})
+        if model.get("requests_per_minute"):
+            limits.append(
+                (("requests", request.key, request.model), model["requests_per_minute"], 1)
+            )
+        if model.get("tokens_per_minute"):
+            limits.append(
+                (
+                    ("tokens", request.key, request.model),
+                    model["tokens_per_minute"],
+                    request.tokens,
+                )
+            )
+        return limits
+
+    def _bucket(self, name: Tuple, per_minute: float) -> TokenBucket:
+        bucket = self._buckets.get(name)
+        if bucket is None:
+            bucket = self._buckets[name] = TokenBucket(per_minute)
+        return bucket
+
+    def _priority_order(self, now: float) -> Tuple[str, ...]:
+        batch = self._queues[BATCH]
+        if (
+            batch
+            and self._interactive_streak >= self.interactive_per_aged_batch
+            and min(q[0].enqueued_at for q in batch.values()) < now - self.batch_max_wait
+        ):
+            return (BATCH, INTERACTIVE)
+        return PRIORITIES
+
+    def _next_request(self, now: float) -> Tuple[Optional[_Request], Optional[float]]:
+        reserved = set()
+        min_wait = None
+
+        for priority in self._priority_order(now):
+            queue = self._queues[priority]
+            for session_id in list(queue):
+                request = queue[session_id][0]
+                limits = self._limits(request)
+                names = {name for name, _, _ in limits}
+                if names & reserved:
+                    continue
+
+                wait = max(
+                    (
+                        self._bucket(name, per_minute).wait_time(amount, now)
+                        for name, per_minute, amount in limits
+                    ),
+                    default=0.0,
+                )
+                if wait > 0:
+                    reserved |= names
+                    min_wait = wait if min_wait is None else min(min_wait, wait)
+                    continue
+
+                for name, per_minute, amount in limits:
+                    self._bucket(name, per_minute).take(amount, now)
+                queue[session_id].popleft()
+                if queue[session_id]:
+                    queue.move_to_end(session_id)
+                else:
+                    del queue[session_id]
+                return request, 0.0
+
+        return None, min_wait
+
+    def _dispatch_loop(self) -> None:
+        with self._cond:
+            while True:
+                if self._inflight >= self.max_concurrency:
+                    self._cond.wait()
+                    continue
+
+                now = time.monotonic()
+                request, wait = self._next_request(now)
+                if request is None:
+                    self._cond.wait(timeout=wait)
+                    continue
+
+                self._inflight += 1
+                if request.priority == INTERACTIVE:
+                    self._interactive_streak += 1
+                else:
+                    self._interactive_streak = 0
+                QUEUE_DEPTH.dec(priority=request.priority)
+                QUEUE_WAIT_SECONDS.observe(
+                    now - request.enqueued_at, priority=request.priority
+                )
+                DISPATCHED.inc(model=request.model, priority=request.priority)
+                self._executor.submit(self._execute, request)
+
+    def _execute(self, request: _Request) -> None:
+        try:
+            if request.attempts == 0 and not request.future.set_running_or_notify_cancel():
+                return
+            request.attempts += 1
+            try:
+                result = request.fn()
+            except Exception as e:
+                if self._rate_limited(e) and request.attempts <= self.max_retries:
+                    self._requeue(request, self._retry_after(e))
+                    return
+                request.future.set_exception(e)
+            else:
+                request.future.set_result(result)
+        finally:
+            with self._cond:
+                self._inflight -= 1
+                self._cond.notify_all()
+
+    def _requeue(self, request: _Request, retry_after: float) -> None:
+        RATE_LIMITED.inc(model=request.model)
+        logger.warning(
+            f"Rate limited on {request.model} for key {request.key}; "
+            f"backing off {retry_after:.1f}s"
+        )
+        with self._cond:
+            now = time.monotonic()
+            for name, per_minute, _ in self._limits(request):
+                self._bucket(name, per_minute).pause(retry_after, now)
+
+            queue = self._queues[request.priority]
+            if request.session_id in queue:
+                queue[request.session_id].appendleft(request)
+            else:
+                queue[request.session_id] = deque([request])
+            queue.move_to_end(request.session_id, last=False)
+            QUEUE_DEPTH.inc(priority=request.priority)
+
+    @staticmethod
+    def _rate_limited(error: Exception) -> bool:
+        return getattr(error, "status_code", None) == 429
+
+    @staticmethod
+    def _retry_after(error: Exception) -> float:
+        response = getattr(error, "response", None)
+        headers = getattr(response, "headers", None) or {}
+        try:
+            return max(float(headers.get("retry-after", 1.0)), 0.0)
+        except (TypeError, ValueError):
+            return 1.0
+
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def get_scheduler(model_limits: Optional[Dict[str, Dict]] = None) -> LLMScheduler:
+    """The process-wide scheduler shared by every ``SpeechGenerator``."""
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = LLMScheduler(model_limits)
+        elif model_limits:
+            _scheduler.model_limits.update(model_limits)
+        return _scheduler
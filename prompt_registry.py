@@ -0,0 +1,263 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from functools import lru_cache
+from string import Formatter
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TEMPLATES_PATH = os.environ.get(
+    "SPEECH_PROMPT_TEMPLATES",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "prompt_templates.json"),
+)
+
+
+# Values every template is rendered with.
+TEMPLATE_FIELDS = frozenset(("topic", "duration", "word_count", "additional_instructions"))
+
+
+class CompiledTemplate:
+    """A ``str.format`` template parsed once into literal and field parts."""
+
+    def __init__(self, template: str):
+        self.template = template
+        self.parts: List[Tuple[str, Optional[str]]] = []
+        for literal, field, spec, conversion in Formatter().parse(template):
+            if spec or conversion:
+                raise ValueError(
+                    f"Unsupported format spec in prompt template: {template!r}"
+                )
+            self.parts.append((literal, field))
+        self.fields = {field for _, field in self.parts if field is not None}
+        unknown = self.fields - TEMPLATE_FIELDS
+        if unknown:
+            # Rejecting at load time keeps the last good templates in use
+            # instead of failing every prompt built from this one.
+            raise ValueError(
+                f"Unknown placeholders {sorted(unknown)} in prompt template: "
+                f"{template!r} (allowed: {', '.join(sorted(TEMPLATE_FIELDS))})"
+            )
+
+    def render(self, values: Dict) -> str:
+        return "".join(
+            literal + (str(values[field]) if field is not None else "")
+            for literal, field in self.parts
+        )
+
+
+def _strings(config: Dict, key: str) -> Dict[str, str]:
+    value = config[key]
+    if (
+        not isinstance(value, dict)
+        or not value
+        or not all(isinstance(text, str) for text in value.values())
+    ):
+        raise ValueError(f"Prompt templates {key!r} must be a non-empty object of strings")
+    return value
+
+
+class TemplateSet:
+    """One loaded template config, validated and compiled.
+
+    It is never modified after construction, so a reload swaps in a new set
+    with a single assignment and a reader always sees one consistent set.
+    """
+
+    REQUIRED_KEYS = ("instructions", "length", "styles", "audiences")
+
+    def __init__(self, config: Dict):
+        if not isinstance(config, dict):
+            raise ValueError("Prompt templates must be a JSON object")
+        missing = [key for key in self.REQUIRED_KEYS if key not in config]
+        if missing:
+            raise ValueError(f"Prompt templates missing keys: {', '.join(missing)}")
+
+        instructions = config["instructions"]
+        if not isinstance(instructions, list) or not all(
+            isinstance(line, str) for line in instructions
+        ):
+            raise ValueError("Prompt templates 'instructions' must be a list of strings")
+        for key in ("length", "additional"):
+            if not isinstance(config.get(key, ""), str):
+                raise ValueError(f"Prompt templates {key!r} must be a string")
+
+        styles = {
+            name: CompiledTemplate(t) for name, t in _strings(config, "styles").items()
+        }
+        audiences = dict(_strings(config, "audiences"))
+        default_style = config.get("default_style", next(iter(styles)))
+        default_audience = config.get("default_audience", next(iter(audiences)))
+        if (
+            not isinstance(default_style, str)
+            or not isinstance(default_audience, str)
+            or default_style not in styles
+            or default_audience not in audiences
+        ):
+            raise ValueError("Prompt template defaults must name a style and audience")
+
+        canonical = json.dumps(config, sort_keys=True, separators=(",", ":"))
+        digest = hashlib.sha256(canonical.encode("utf-8")).hexdigest()[:12]
+
+        self.config = config
+        self.version = config.get("version", 0)
+        self.fingerprint = f"v{self.version}-{digest}"
+        self.prefix = "\n".join(instructions) + "\n\n"
+        self.styles = styles
+        self.audiences = audiences
+        self.default_style = default_style
+        self.default_audience = default_audience
+        self.length = CompiledTemplate(config["length"])
+        self.additional = CompiledTemplate(
+            config.get("additional", "Additional instructions: {additional_instructions}")
+        )
+        self.render = lru_cache(maxsize=256)(self._render)
+
+    def audience_note(self, audience: str) -> str:
+        return self.audiences.get(audience, self.audiences[self.default_audience])
+
+    def _render(
+        self,
+        topic: str,
+        duration: int,
+        style: str,
+        audience: str,
+        additional_instructions: str,
+    ) -> str:
+        values = {
+            "topic": topic,
+            "duration": duration,
+            "word_count": duration * 130,
+            "additional_instructions": additional_instructions,
+        }
+        template = self.styles.get(style, self.styles[self.default_style])
+
+        prompt = (
+            f"{self.prefix}"
+            f"{template.render(values)}\n\n"
+            f"{self.audience_note(audience)}\n\n"
+            f"{self.length.render(values)}\n"
+        )
+        if additional_instructions:
+            prompt += f"\n{self.additional.render(values)}\n"
+        return prompt
+
+
+class PromptRegistry:
+    """Speech prompt templates loaded from a JSON config file.
+
+    The file is re-read when its modification time changes, so styles and
+    audiences can be added without a restart. Every prompt starts with the
+    same static instruction block so provider-side prompt caching can reuse
+    it; only the style, audience and length lines vary per request.
+    """
+
+    def __init__(self, path: str = DEFAULT_TEMPLATES_PATH, reload_interval: float = 1.0):
+        self.path = path
+        self.reload_interval = reload_interval
+        self._lock = threading.Lock()
+        self._stamp = None
+        self._checked_at = 0.0
+        self._load()
+
+    @property
+    def templates(self) -> TemplateSet:
+        return self._templates
+
+    @property
+    def fingerprint(self) -> str:
+        return self._templates.fingerprint
+
+    @property
+    def version(self):
+        return self._templates.version
+
+    def _load(self) -> None:
+        stat = os.stat(self.path)
+        with open(self.path, "r", encoding="utf-8") as f:
+            templates = TemplateSet(json.load(f))
+        # Readers don't take the lock; one assignment means they see either
+        # the old set or the new one, never a mix.
+        self._templates = templates
+        self._stamp = (stat.st_mtime_ns, stat.st_size)
+        logger.info(f"Loaded prompt templates {templates.fingerprint} from {self.path}")
+
+    def refresh(self, force: bool = False) -> bool:
+        now = time.monotonic()
+        if not force and now - self._checked_at < self.reload_interval:
+            return False
+
+        with self._lock:
+            self._checked_at = now
+            try:
+                stat = os.stat(self.path)
+                stamp = (stat.st_mtime_ns, stat.st_size)
+                if not force and stamp == self._stamp:
+                    return False
+                # Remember the stamp even if loading fails, so a broken file
+                # is reported once rather than on every access.
+                self._stamp = stamp
+                self._load()
+                return True
+            except Exception as e:
+                # Any bad edit, not just unreadable or invalid JSON, keeps
+                # the last good templates serving.
+                logger.error(
+                    f"Keeping prompt templates {self.fingerprint}; reload failed: {str(e)}"
+                )
+                return False
+
+    def style_names(self) -> List[str]:
+        self.refresh()
+        return list(self._templates.styles)
+
+    def audience_names(self) -> List[str]:
+        self.refresh()
+        return list(self._templates.audiences)
+
+    def style_templates(self) -> Dict[str, str]:
+        self.refresh()
+        return {name: t.template for name, t in self._templates.styles.items()}
+
+    def audience_guidance(self) -> Dict[str, str]:
+        self.refresh()
+        return dict(self._templates.audiences)
+
+    def audience_note(self, audience: str) -> str:
+        self.refresh()
+        return self._templates.audience_note(audience)
+
+    def render(
+        self,
+        topic: str,
+        duration: int,
+        style: str,
+        audience: str,
+        additional_instructions: str = "",
+    ) -> str:
+        self.refresh()
+        return self._templates.render(
+            topic, duration, style, audience, additional_instructions
+        )
+
+    def cache_key(self, **params) -> str:
+        self.refresh()
+        canonical = json.dumps(params, sort_keys=True, separators=(",", ":"))
+        digest = hashlib.sha256(canonical.encode("utf-8")).hexdigest()[:16]
+        return f"{self.fingerprint}:{digest}"
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_prompt_registry() -> PromptRegistry:
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = PromptRegistry()
+    return _registry
@@ -1,128 +1,137 @@
 import os
-import nltk
-
-nltk.download()
-import re  # noqa: E402
-import logging  # noqa: E402
-import base64  # noqa: E402
-from typing import Dict, Tuple  # noqa: E402
-import pyttsx3  # noqa: E402
-import tempfile  # noqa: E402
-from groq import Groq  # noqa: E402
-from nltk.tokenize import sent_tokenize  # noqa: E402
-
-logging.basicConfig(
-    level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
-)
+import re
+import logging
+import base64
+from typing import Dict, Optional, Tuple
+import tempfile
+import time
+import uuid
+from llm_scheduler import INTERACTIVE, get_scheduler
+from metrics import REGISTRY, timed, timed_stage
+from prompt_registry import get_prompt_registry
+from speech_structure import StructureAnalyzer
+from tts_engine import get_tts_engine
+
+# groq and pyttsx3 are imported on first use: coach-only sessions never need
+# them, and pyttsx3 loads a platform speech driver on import.
+
 logger = logging.getLogger(__name__)
 
+LLM_REQUEST_SECONDS = REGISTRY.histogram(
+    "speech_master_llm_request_seconds",
+    "Wall time of Groq chat completion requests.",
+    labelnames=("model",),
+)
+LLM_FIRST_TOKEN_SECONDS = REGISTRY.histogram(
+    "speech_master_llm_time_to_first_token_seconds",
+    "Time from sending a Groq request to the first streamed token.",
+    labelnames=("model",),
+)
+LLM_TOKENS = REGISTRY.counter(
+    "speech_master_llm_tokens_total",
+    "Tokens reported by Groq, by kind (prompt or completion).",
+    labelnames=("model", "kind"),
+)
+LLM_ERRORS = REGISTRY.counter(
+    "speech_master_llm_errors_total",
+    "Groq requests that raised.",
+    labelnames=("model",),
+)
 
-class SpeechGenerator:
-    STYLE_TEMPLATES = {
-        "formal": "Write a formal {duration}-minute speech about '{topic}' suitable for a professional audience.",
-        "casual": "Write a casual, friendly {duration}-minute speech about '{topic}'.",
-        "motivational": "Write an inspiring {duration}-minute motivational speech about '{topic}' that energizes the audience.",
-        "persuasive": "Write a compelling {duration}-minute persuasive speech about '{topic}' to change minds.",
-        "instructional": "Write a step-by-step {duration}-minute instructional speech on '{topic}'.",
-        "debate": "Write a {duration}-minute debate speech about '{topic}' with strong arguments and counterpoints.",
-        "humorous": "Write a funny {duration}-minute speech about '{topic}' with appropriate humor and wit.",
-        "storytelling": "Write an engaging {duration}-minute speech about '{topic}' using storytelling techniques.",
-    }
 
-    AUDIENCE_GUIDANCE = {
-        "general": "Make the speech accessible to a general audience with no specialized knowledge.",
-        "experts": "Include technical depth suitable for experts in the field.",
-        "children": "Use simple, engaging language and examples suitable for kids.",
-        "students": "Be educational and engaging for a student audience.",
-        "executives": "Focus on strategic implications and leadership perspectives.",
-        "international": "Use globally accessible references and minimize culturally specific idioms.",
-    }
+def _stream_usage(chunk) -> Dict:
+    # Groq reports usage on the final streamed chunk under ``x_groq``.
+    x_groq = getattr(chunk, "x_groq", None)
+    if isinstance(x_groq, dict):
+        usage = x_groq.get("usage")
+    else:
+        usage = getattr(x_groq, "usage", None)
+    if usage is None:
+        usage = getattr(chunk, "usage", None)
+    if usage is None:
+        return {}
+    if not isinstance(usage, dict):
+        usage = {
+            key: getattr(usage, key, 0)
+            for key in ("prompt_tokens", "completion_tokens", "total_tokens")
+        }
+    return {key: value or 0 for key, value in usage.items()}
+
+
+class _RegistryView:
+    def __init__(self, accessor):
+        self.accessor = accessor
+
+    def __get__(self, instance, owner):
+        return getattr(get_prompt_registry(), self.accessor)()
+
+
+class SpeechGenerator:
+    # Read-through views of the prompt template registry, kept for callers
+    # that index the class attributes directly.
+    STYLE_TEMPLATES = _RegistryView("style_templates")
+    AUDIENCE_GUIDANCE = _RegistryView("audience_guidance")
 
     AVAILABLE_MODELS = {
         "llama3-8b-8192": {
             "description": "Balanced model for general use",
             "max_tokens": 8192,
+            "requests_per_minute": 30,
+            "tokens_per_minute": 30000,
         },
         "llama3-70b-8192": {
             "description": "Advanced model with better quality",
             "max_tokens": 8192,
+            "requests_per_minute": 30,
+            "tokens_per_minute": 6000,
         },
         "gemma-7b-it": {
             "description": "Efficient model for simpler tasks",
             "max_tokens": 4096,
+            "requests_per_minute": 30,
+            "tokens_per_minute": 15000,
         },
         "mixtral-8x7b-32768": {
             "description": "High-capacity model for longer context",
             "max_tokens": 32768,
+            "requests_per_minute": 30,
+            "tokens_per_minute": 5000,
         },
     }
 
     TTS_VOICES = {
         "male": {
+            "voice_index": 0,
             "rate": 170,
             "volume": 1.0,
             "description": "Clear, professional male voice",
         },
         "female": {
+            "voice_index": 1,
             "rate": 165,
             "volume": 1.0,
             "description": "Clear, professional female voice",
         },
     }
 
-    def __init__(self, api_key=None):
+    def __init__(self, api_key=None, session_id=None):
         self.api_key = api_key
         self.client = None
+        self.session_id = session_id or uuid.uuid4().hex
+        self.scheduler = get_scheduler(self.AVAILABLE_MODELS)
         self.output_folder = "speech_outputs"
         self.audio_folder = os.path.join(self.output_folder, "audio")
         self.history = []
-        self.engine = None
+        self.registry = get_prompt_registry()
+        self.tts_engine = get_tts_engine(self.TTS_VOICES)
 
         for folder in [self.output_folder, self.audio_folder]:
             if not os.path.exists(folder):
                 os.makedirs(folder)
 
-        self._initialize_tts_engine()
-
         if api_key:
             self.set_api_key(api_key)
 
-    def _initialize_tts_engine(self):
-        try:
-            self.engine = pyttsx3.init()
-            self.engine.setProperty("rate", 170)
-            self.engine.setProperty("volume", 1.0)
-
-            voices = self.engine.getProperty("voices")
-            self.available_voices = voices
-
-            if len(voices) > 0:
-                self.engine.setProperty("voice", voices[0].id)
-                logger.info(f"TTS engine initialized with {len(voices)} voices")
-            else:
-                logger.warning("No voices found for TTS engine")
-
-        except Exception as e:
-            logger.error(f"Failed to initialize TTS engine: {str(e)}")
-            self.engine = None
-
-    def set_voice(self, voice_type="male"):
-        if not self.engine or not hasattr(self, "available_voices"):
-            return
-
-        voices = self.available_voices
-
-        if voice_type == "female":
-            if len(voices) > 1:
-                self.engine.setProperty("voice", voices[1].id)
-            else:
-                self.engine.setProperty("voice", voices[0].id)
-        else:
-            self.engine.setProperty("voice", voices[0].id)
-
-        self.engine.setProperty("rate", self.TTS_VOICES[voice_type]["rate"])
-        self.engine.setProperty("volume", self.TTS_VOICES[voice_type]["volume"])
-
     def set_api_key(self, api_key: str) -> None:
         self.api_key = api_key
         self.initialize_client()
@@ -130,6 +139,8 @@ class SpeechGenerator:
 
     def initialize_client(self) -> None:
         if self.api_key:
+            from groq import Groq
+
             self.client = Groq(api_key=self.api_key)
             logger.info("Groq client initialized.")
         else:
@@ -137,6 +148,7 @@ class SpeechGenerator:
                 "No API key available. Set API key before generating speeches."
             )
 
+    @timed_stage("build_prompt")
     def build_prompt(
         self,
         topic: str,
@@ -145,30 +157,10 @@ class SpeechGenerator:
         audience: str = "general",
         additional_instructions: str = "",
     ) -> str:
-        base_prompt = self.STYLE_TEMPLATES.get(
-            emotion, self.STYLE_TEMPLATES["formal"]
-        ).format(topic=topic, duration=duration)
-        audience_note = self.AUDIENCE_GUIDANCE.get(
-            audience, self.AUDIENCE_GUIDANCE["general"]
-        )
-
-        word_count = duration * 130
-
-        final_prompt = (
-            f"{base_prompt}\n\n"
-            f"{audience_note}\n\n"
-            f"Structure the speech with an introduction, body, and conclusion.\n"
-            f"Use engaging transitions, rhetorical devices, and paragraph breaks.\n"
-            f"Include natural pauses (marked with [pause]) and emphasis points (marked with *emphasis*) to guide the delivery.\n"
-            f"Add occasional delivery notes in [brackets] for pacing, tone, or gestures.\n"
-            f"Aim for approximately {word_count} words to fill {duration} minutes when delivered aloud.\n"
+        return self.registry.render(
+            topic, duration, emotion, audience, additional_instructions
         )
 
-        if additional_instructions:
-            final_prompt += f"\nAdditional instructions: {additional_instructions}\n"
-
-        return final_prompt
-
     def generate_speech(
         self,
         topic: str,
@@ -178,6 +170,8 @@ class SpeechGenerator:
         model: str = "llama3-8b-8192",
         temperature: float = 0.7,
         additional_instructions: str = "",
+        priority: str = INTERACTIVE,
+        record_history: bool = True,
     ) -> Tuple[str, Dict]:
         if not self.client:
             raise ValueError("API key not set. Use set_api_key() first.")
@@ -193,37 +187,98 @@ class SpeechGenerator:
             "audience": audience,
             "model": model,
             "temperature": temperature,
+            "prompt_fingerprint": self.registry.fingerprint,
             "timestamp": None,
             "word_count": 0,
         }
 
+        # Roughly 4/3 tokens per English word of completion.
+        expected_tokens = len(prompt) // 4 + duration * 130 * 4 // 3
+        speech, usage = self.complete(
+            prompt, model, temperature, priority, expected_tokens
+        )
+
+        import datetime
+
+        metadata["timestamp"] = datetime.datetime.now().isoformat()
+        metadata["word_count"] = len(speech.split())
+        metadata["usage"] = usage
+
+        if record_history:
+            self.history.append(metadata)
+
+        return speech, metadata
+
+    def complete(
+        self,
+        prompt: str,
+        model: str = "llama3-8b-8192",
+        temperature: float = 0.7,
+        priority: str = INTERACTIVE,
+        expected_tokens: Optional[int] = None,
+    ) -> Tuple[str, Dict]:
+        if not self.client:
+            raise ValueError("API key not set. Use set_api_key() first.")
+
+        if expected_tokens is None:
+            expected_tokens = len(prompt) // 4 + 1024
+
+        text, usage = self.scheduler.call(
+            lambda: self._complete(prompt, model, temperature),
+            api_key=self.api_key,
+            model=model,
+            session_id=self.session_id,
+            priority=priority,
+            tokens=expected_tokens,
+        )
+        if usage["total_tokens"]:
+            self.scheduler.settle(
+                self.api_key, model, expected_tokens, usage["total_tokens"]
+            )
+        return text, usage
+
+    def _complete(
+        self, prompt: str, model: str, temperature: float
+    ) -> Tuple[str, Dict]:
+        usage = {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0}
+        parts = []
+        started = time.perf_counter()
+
         try:
             max_tokens = self.AVAILABLE_MODELS.get(model, {}).get("max_tokens", 2048)
 
-            completion = self.client.chat.completions.create(
+            stream = self.client.chat.completions.create(
                 model=model,
                 messages=[{"role": "user", "content": prompt}],
                 temperature=temperature,
                 max_tokens=min(max_tokens, 4096),
                 top_p=1,
-                stream=False,
+                stream=True,
             )
 
-            speech = completion.choices[0].message.content
-
-            import datetime
-
-            metadata["timestamp"] = datetime.datetime.now().isoformat()
-            metadata["word_count"] = len(speech.split())
-
-            self.history.append(metadata)
-
-            return speech, metadata
+            for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    if not parts:
+                        LLM_FIRST_TOKEN_SECONDS.observe(
+                            time.perf_counter() - started, model=model
+                        )
+                    parts.append(chunk.choices[0].delta.content)
+                usage.update(_stream_usage(chunk))
 
         except Exception as e:
+            LLM_ERRORS.inc(model=model)
             logger.error(f"API error: {str(e)}")
             raise
 
+        finally:
+            LLM_REQUEST_SECONDS.observe(time.perf_counter() - started, model=model)
+
+        LLM_TOKENS.inc(usage["prompt_tokens"], model=model, kind="prompt")
+        LLM_TOKENS.inc(usage["completion_tokens"], model=model, kind="completion")
+
+        return "".join(parts), usage
+
+    @timed_stage("prepare_text_for_tts")
     def prepare_text_for_tts(self, text: str) -> str:
         text = re.sub(r"\[.*?\]", "", text)
         text = re.sub(r"\*(.*?)\*", r"\1", text)
@@ -231,23 +286,31 @@ class SpeechGenerator:
 
         return text
 
-    def generate_speech_audio(self, text: str, voice: str = "male") -> str:
-        if not self.engine:
-            raise ValueError(
-                "TTS engine not available. Check logs for initialization errors."
-            )
-
+    def generate_speech_audio(
+        self, text: str, voice: str = "male", output_path: Optional[str] = None
+    ) -> str:
         clean_text = self.prepare_text_for_tts(text)
-        self.set_voice(voice)
-
-        temp_file = tempfile.NamedTemporaryFile(delete=False, suffix=".mp3")
-        temp_file.close()
+        return self.synthesize(clean_text, voice, output_path)
 
-        output_path = temp_file.name
+    def synthesize(
+        self, clean_text: str, voice: str = "male", output_path: Optional[str] = None
+    ) -> str:
+        if voice not in self.TTS_VOICES:
+            raise ValueError(f"Unknown voice: {voice}")
+
+        if output_path is None:
+            # Keep audio in the output folder rather than the system temp dir
+            # so it outlives the session that produced it.
+            temp_file = tempfile.NamedTemporaryFile(
+                delete=False, suffix=".mp3", prefix="speech_", dir=self.audio_folder
+            )
+            temp_file.close()
+            output_path = temp_file.name
 
         try:
-            self.engine.save_to_file(clean_text, output_path)
-            self.engine.runAndWait()
+            # The shared engine runs one request at a time on its own thread,
+            # so switching voices never changes it under another request.
+            self.tts_engine.synthesize(voice, clean_text, output_path)
 
             logger.info(f"Audio saved to {output_path}")
             return output_path
@@ -262,45 +325,54 @@ class SpeechGenerator:
 
 
 class PresentationCoach:
+    POSITIVE_WORDS = (
+        "good",
+        "great",
+        "excellent",
+        "positive",
+        "happy",
+        "joy",
+        "love",
+        "wonderful",
+        "fantastic",
+        "amazing",
+        "best",
+        "better",
+        "success",
+    )
+    NEGATIVE_WORDS = (
+        "bad",
+        "poor",
+        "terrible",
+        "negative",
+        "sad",
+        "hate",
+        "worst",
+        "fail",
+        "failure",
+        "awful",
+        "unfortunately",
+        "problem",
+        "issue",
+        "difficult",
+    )
+
     def __init__(self):
-        pass
+        self.structure_analyzer = StructureAnalyzer()
 
+    @timed_stage("coach_sentiment")
     def analyze_sentiment(self, text):
-        positive_words = [
-            "good",
-            "great",
-            "excellent",
-            "positive",
-            "happy",
-            "joy",
-            "love",
-            "wonderful",
-            "fantastic",
-            "amazing",
-            "best",
-            "better",
-            "success",
-        ]
-        negative_words = [
-            "bad",
-            "poor",
-            "terrible",
-            "negative",
-            "sad",
-            "hate",
-            "worst",
-            "fail",
-            "failure",
-            "awful",
-            "unfortunately",
-            "problem",
-            "issue",
-            "difficult",
-        ]
-
         text_lower = text.lower()
-        pos_count = sum(1 for word in positive_words if word in text_lower)
-        neg_count = sum(1 for word in negative_words if word in text_lower)
+        found = {
+            word
+            for word in self.POSITIVE_WORDS + self.NEGATIVE_WORDS
+            if word in text_lower
+        }
+        return self._sentiment(found)
+
+    def _sentiment(self, found):
+        pos_count = sum(1 for word in self.POSITIVE_WORDS if word in found)
+        neg_count = sum(1 for word in self.NEGATIVE_WORDS if word in found)
 
         total = pos_count + neg_count
         if total == 0:
@@ -315,22 +387,87 @@ class PresentationCoach:
 
         return label, confidence * 100
 
+    @timed_stage("coach_structure")
+    def analyze_structure(self, text):
+        return self.structure_analyzer.analyze(text)
+
     def structure_score(self, text):
-        sentences = sent_tokenize(text)
-        score = min(100, len(sentences) * 10)
-        return round(score, 2), len(sentences)
+        report = self.analyze_structure(text)
+        return report["score"], report["sentence_count"]
 
+    @timed_stage("coach_complexity")
     def analyze_complexity(self, text):
         words = text.split()
-        if not words:
+        return self._complexity(sum(len(word) for word in words), len(words))
+
+    @staticmethod
+    def _complexity(total_length, word_count):
+        if not word_count:
             return 0
 
-        avg_word_length = sum(len(word) for word in words) / len(words)
+        avg_word_length = total_length / word_count
 
         complexity_score = min(100, avg_word_length * 10)
 
         return round(complexity_score, 2)
 
+    @timed_stage("coach_stream")
+    def analyze_stream(self, source, chunk_size=64 * 1024, max_buffer=64 * 1024):
+        """Coach a transcript too large to hold in memory.
+
+        ``source`` is a file path, an open text file or an iterable of
+        strings. Text is read ``chunk_size`` characters at a time and only
+        running totals are kept, so memory stays flat however long the
+        transcript is. Scores match the in-memory methods for the same text.
+        Text without sentence ends is parsed ``max_buffer`` characters at a
+        time.
+        """
+        sentiment_words = self.POSITIVE_WORDS + self.NEGATIVE_WORDS
+        # Keep enough of the previous chunk to find a word split across chunks.
+        overlap = max(len(word) for word in sentiment_words) - 1
+        found = set()
+        tail = ""
+
+        word_count = 0
+        total_length = 0
+        partial = ""
+
+        structure = self.structure_analyzer.stream(max_buffer=max_buffer)
+
+        for chunk in _read_chunks(source, chunk_size):
+            if not chunk:
+                continue
+            window = tail + chunk.lower()
+            found.update(word for word in sentiment_words if word in window)
+            tail = window[-overlap:]
+
+            # A chunk may end mid-word; carry it over to the next one.
+            data = partial + chunk
+            words = data.split()
+            partial = words.pop() if words and not data[-1].isspace() else ""
+            word_count += len(words)
+            total_length += sum(len(word) for word in words)
+
+            structure.feed(chunk)
+
+        if partial:
+            word_count += 1
+            total_length += len(partial)
+
+        label, confidence = self._sentiment(found)
+        report = structure.report()
+        complexity = self._complexity(total_length, word_count)
+        return {
+            "sentiment": (label, confidence),
+            "structure": report,
+            "complexity": complexity,
+            "word_count": word_count,
+            "suggestions": self.suggest_improvements(
+                label, confidence, report["sentence_count"], complexity
+            ),
+        }
+
+    @timed_stage("coach_suggestions")
     def suggest_improvements(self, label, confidence, sentence_count, complexity_score):
         suggestions = []
 
@@ -367,9 +504,28 @@ class PresentationCoach:
         return suggestions
 
 
+def _read_chunks(source, chunk_size):
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, "r", encoding="utf-8") as f:
+            yield from _read_chunks(f, chunk_size)
+    elif hasattr(source, "read"):
+        while True:
+            chunk = source.read(chunk_size)
+            if not chunk:
+                return
+            yield chunk
+    else:
+        yield from source
+
+
+def read_binary_file(path):
+    with timed("file_read"):
+        with open(path, "rb") as f:
+            return f.read()
+
+
 def get_binary_file_downloader_html(bin_file, file_label="File"):
-    with open(bin_file, "rb") as f:
-        data = f.read()
+    data = read_binary_file(bin_file)
     bin_str = base64.b64encode(data).decode()
     href = f'<a href="data:application/octet-stream;base64,{bin_str}" download="{os.path.basename(bin_file)}" class="download-button">Download {file_label}</a>'
     return href
@@ -0,0 +1,275 @@
+import logging
+import time
+from typing import Dict, List, Optional, Tuple
+
+from speech_structure import PARAGRAPH, get_span_index
+
+logger = logging.getLogger(__name__)
+
+WORDS_PER_MINUTE = 130
+
+
+class QualityTargets:
+    def __init__(
+        self,
+        duration: int,
+        word_tolerance: float = 0.10,
+        complexity_band: Tuple[float, float] = (40, 70),
+        sentiments: Tuple[str, ...] = ("POSITIVE", "NEUTRAL"),
+    ):
+        self.duration = duration
+        self.word_tolerance = word_tolerance
+        self.complexity_band = complexity_band
+        self.sentiments = sentiments
+
+    @property
+    def target_words(self) -> int:
+        return self.duration * WORDS_PER_MINUTE
+
+    def as_dict(self) -> Dict:
+        return {
+            "target_words": self.target_words,
+            "word_tolerance": self.word_tolerance,
+            "complexity_band": list(self.complexity_band),
+            "sentiments": list(self.sentiments),
+        }
+
+
+class SpeechQualityLoop:
+    """Generate a speech, coach it in-process and rewrite only what misses.
+
+    The first completion is scored with ``PresentationCoach``; sections that
+    push word count, complexity or sentiment out of target are re-requested
+    individually instead of regenerating the whole speech.
+    """
+
+    SECTION_SHARES = {"intro": 0.15, "body": 0.70, "conclusion": 0.15}
+    SECTION_LABELS = {
+        "intro": "introduction",
+        "body": "body",
+        "conclusion": "conclusion",
+        "speech": "speech",
+    }
+
+    def __init__(self, generator, coach, max_rounds: int = 3):
+        self.generator = generator
+        self.coach = coach
+        self.max_rounds = max_rounds
+
+    def evaluate(self, speech: str, targets: QualityTargets) -> Dict:
+        word_count = len(speech.split())
+        complexity = self.coach.analyze_complexity(speech)
+        sentiment, confidence = self.coach.analyze_sentiment(speech)
+
+        low, high = targets.complexity_band
+        failures = []
+        if abs(word_count - targets.target_words) > (
+            targets.target_words * targets.word_tolerance
+        ):
+            failures.append("word_count")
+        if not low <= complexity <= high:
+            failures.append("complexity")
+        if sentiment not in targets.sentiments:
+            failures.append("sentiment")
+
+        return {
+            "word_count": word_count,
+            "complexity": complexity,
+            "sentiment": sentiment,
+            "confidence": confidence,
+            "failures": failures,
+            "passed": not failures,
+        }
+
+    def run(
+        self,
+        topic: str,
+        duration: int,
+        emotion: str,
+        audience: str,
+        model: str = "llama3-8b-8192",
+        temperature: float = 0.7,
+        additional_instructions: str = "",
+        targets: Optional[QualityTargets] = None,
+    ) -> Tuple[str, Dict]:
+        targets = targets or QualityTargets(duration)
+        started = time.perf_counter()
+
+        speech, metadata = self.generator.generate_speech(
+            topic=topic,
+            duration=duration,
+            emotion=emotion,
+            audience=audience,
+            model=model,
+            temperature=temperature,
+            additional_instructions=additional_instructions,
+        )
+        usage = dict(metadata["usage"])
+        first_pass_tokens = usage["total_tokens"]
+        context = {
+            "topic": topic,
+            "duration": duration,
+            "emotion": emotion,
+            "audience": audience,
+            "model": model,
+            "temperature": temperature,
+        }
+
+        rounds = 0
+        rewritten: List[str] = []
+        check = self.evaluate(speech, targets)
+        stalled = False
+        while not check["passed"] and rounds < self.max_rounds:
+            sections = self._split_sections(speech)
+            plan = self._plan_rewrites(sections, check, targets)
+            if not plan:
+                logger.warning(
+                    f"No section could be targeted for {check['failures']}; "
+                    "stopping rewrites"
+                )
+                stalled = True
+                break
+            rounds += 1
+
+            for name, (words, fixes) in plan.items():
+                prompt = self._build_section_prompt(
+                    context, name, sections[name], words, fixes
+                )
+                text, section_usage = self.generator.complete(
+                    prompt, model, temperature
+                )
+                sections[name] = text.strip()
+                rewritten.append(name)
+                for key in usage:
+                    usage[key] += section_usage.get(key, 0)
+
+            speech = "\n\n".join(sections.values())
+            check = self.evaluate(speech, targets)
+
+        wall_time = time.perf_counter() - started
+        full_retry_tokens = first_pass_tokens * (rounds + 1)
+
+        metadata["word_count"] = check["word_count"]
+        metadata["usage"] = usage
+        metadata["quality"] = {
+            "accepted": check["passed"],
+            "rounds": rounds,
+            "rewritten_sections": rewritten,
+            "stalled": stalled,
+            "checks": check,
+            "targets": targets.as_dict(),
+            "total_tokens": usage["total_tokens"],
+            "full_regeneration_tokens_estimate": full_retry_tokens,
+            "wall_time": round(wall_time, 3),
+        }
+
+        status = "Accepted" if check["passed"] else "Gave up on"
+        logger.info(
+            f"{status} speech after {rounds} rewrite rounds: "
+            f"{usage['total_tokens']} tokens "
+            f"(full regeneration estimate {full_retry_tokens}), "
+            f"{wall_time:.2f}s wall time"
+        )
+
+        return speech, metadata
+
+    def _split_sections(self, speech: str) -> Dict[str, str]:
+        index = get_span_index(speech)
+        paragraphs = index.spans(PARAGRAPH)
+        if len(paragraphs) < 3:
+            return {"speech": speech.strip()}
+
+        return {
+            "intro": index.text_of(paragraphs[0]),
+            "body": speech[paragraphs[1].start : paragraphs[-2].end],
+            "conclusion": index.text_of(paragraphs[-1]),
+        }
+
+    def _plan_rewrites(
+        self, sections: Dict[str, str], check: Dict, targets: QualityTargets
+    ) -> Dict[str, Tuple[int, List[str]]]:
+        shares = self.SECTION_SHARES if len(sections) == 3 else {"speech": 1.0}
+        words = {name: len(text.split()) for name, text in sections.items()}
+        fixes: Dict[str, List[str]] = {}
+        # A check can fail for the whole speech while every section passes
+        # it on its own (e.g. positive sections that are negative together);
+        # the largest section is then rewritten so the round is not wasted.
+        largest = max(shares, key=shares.get)
+
+        if "word_count" in check["failures"]:
+            too_short = check["word_count"] < targets.target_words
+            for name, share in shares.items():
+                ratio = words[name] / (targets.target_words * share)
+                if (too_short and ratio < 1 - targets.word_tolerance) or (
+                    not too_short and ratio > 1 + targets.word_tolerance
+                ):
+                    fixes.setdefault(name, []).append(
+                        "Expand it with more detail and examples."
+                        if too_short
+                        else "Tighten it and cut repetition."
+                    )
+            if not fixes:
+                fixes[largest] = [
+                    "Expand it with more detail and examples."
+                    if too_short
+                    else "Tighten it and cut repetition."
+                ]
+
+        low, high = targets.complexity_band
+        if "complexity" in check["failures"]:
+            too_simple = check["complexity"] < low
+            fix = (
+                "Use more varied, precise vocabulary."
+                if too_simple
+                else "Use simpler words and shorter sentences."
+            )
+            targeted = False
+            for name, text in sections.items():
+                complexity = self.coach.analyze_complexity(text)
+                if complexity < low if too_simple else complexity > high:
+                    fixes.setdefault(name, []).append(fix)
+                    targeted = True
+            if not targeted:
+                fixes.setdefault(largest, []).append(fix)
+
+        if "sentiment" in check["failures"]:
+            fix = "Frame the points more positively and constructively."
+            targeted = False
+            for name, text in sections.items():
+                label, _ = self.coach.analyze_sentiment(text)
+                if label not in targets.sentiments:
+                    fixes.setdefault(name, []).append(fix)
+                    targeted = True
+            if not targeted:
+                fixes.setdefault(largest, []).append(fix)
+
+        # Size rewritten sections so the whole speech lands on target, given
+        # the words already fixed in the sections we keep.
+        kept_words = sum(words[name] for name in sections if name not in fixes)
+        remaining = max(targets.target_words - kept_words, 0)
+        rewrite_share = sum(shares[name] for name in fixes) or 1.0
+
+        return {
+            name: (
+                max(int(remaining * shares[name] / rewrite_share), 20),
+                section_fixes,
+            )
+            for name, section_fixes in fixes.items()
+        }
+
+    def _build_section_prompt(
+        self, context: Dict, name: str, text: str, words: int, fixes: List[str]
+    ) -> str:
+        audience_note = self.generator.registry.audience_note(context["audience"])
+        label = self.SECTION_LABELS[name]
+        return (
+            f"You are revising the {label} of a {context['duration']}-minute "
+            f"{context['emotion']} speech about '{context['topic']}'.\n"
+            f"{audience_note}\n\n"
+            f"Rewrite the {label} below in approximately {words} words. "
+            f"{' '.join(fixes)}\n"
+            f"Keep the natural pauses marked with [pause], emphasis marked with "
+            f"*emphasis* and delivery notes in [brackets].\n"
+            f"Return only the rewritten {label}, without headings or commentary.\n\n"
+            f"{text}\n"
+        )
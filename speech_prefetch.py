@@ -0,0 +1,207 @@
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, List, Tuple
+
+from llm_scheduler import BATCH
+from metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+MIN_DURATION = 1
+MAX_DURATION = 15
+
+PREFETCH_LOOKUPS = REGISTRY.counter(
+    "speech_master_prefetch_lookups_total",
+    "Speech requests answered from the speculative cache (hit), from a "
+    "prefetch still in flight (inflight) or by a fresh generation (miss).",
+    labelnames=("result",),
+)
+PREFETCH_TOKENS = REGISTRY.counter(
+    "speech_master_prefetch_tokens_total",
+    "Tokens spent on speculative generations, and tokens of those that were used.",
+    labelnames=("kind",),
+)
+
+REQUEST_FIELDS = (
+    "topic",
+    "duration",
+    "emotion",
+    "audience",
+    "model",
+    "temperature",
+    "additional_instructions",
+)
+
+
+class SpeculativePrefetcher:
+    """Answer repeat generations from speculatively prefetched variants.
+
+    After each generation, variants with an adjacent duration and the next
+    style are generated in the background at batch priority, until
+    ``token_budget`` tokens have been spent. Cache entries are keyed by the
+    prompt registry's cache key, the same way a normal request would be.
+
+    Other ``SpeechGenerator`` attributes are delegated, so the prefetcher can
+    stand in for the generator (e.g. in ``SpeechQualityLoop``).
+    """
+
+    def __init__(
+        self,
+        generator,
+        token_budget: int = 20000,
+        max_entries: int = 32,
+        max_workers: int = 2,
+    ):
+        self.generator = generator
+        self.token_budget = token_budget
+        self.max_entries = max_entries
+
+        self._cache: "OrderedDict[str, Tuple[str, Dict]]" = OrderedDict()
+        self._inflight: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="prefetch"
+        )
+
+        self.tokens_spent = 0
+        self.tokens_reserved = 0
+        self.tokens_used = 0
+        self.hits = 0
+        self.inflight_hits = 0
+        self.misses = 0
+
+    def __getattr__(self, name):
+        if name == "generator":
+            raise AttributeError(name)
+        return getattr(self.generator, name)
+
+    def request_key(self, request: Dict) -> str:
+        return self.generator.registry.cache_key(
+            **{field: request[field] for field in REQUEST_FIELDS}
+        )
+
+    def generate_speech(
+        self,
+        topic: str,
+        duration: int,
+        emotion: str,
+        audience: str,
+        model: str = "llama3-8b-8192",
+        temperature: float = 0.7,
+        additional_instructions: str = "",
+        **kwargs,
+    ) -> Tuple[str, Dict]:
+        request = {
+            "topic": topic,
+            "duration": duration,
+            "emotion": emotion,
+            "audience": audience,
+            "model": model,
+            "temperature": temperature,
+            "additional_instructions": additional_instructions,
+        }
+        key = self.request_key(request)
+
+        with self._lock:
+            cached = self._cache.pop(key, None)
+            pending = self._inflight.get(key) if cached is None else None
+
+        if cached is None and pending is not None:
+            try:
+                cached = pending.result()
+            except Exception:
+                cached = None
+            else:
+                with self._lock:
+                    self._cache.pop(key, None)
+                    self.inflight_hits += 1
+                PREFETCH_LOOKUPS.inc(result="inflight")
+
+        if cached is not None:
+            speech, metadata = cached
+            metadata = dict(metadata, prefetched=True)
+            with self._lock:
+                if pending is None:
+                    self.hits += 1
+                self.tokens_used += metadata["usage"]["total_tokens"]
+            if pending is None:
+                PREFETCH_LOOKUPS.inc(result="hit")
+            PREFETCH_TOKENS.inc(metadata["usage"]["total_tokens"], kind="used")
+            self.generator.history.append(metadata)
+        else:
+            with self._lock:
+                self.misses += 1
+            PREFETCH_LOOKUPS.inc(result="miss")
+            speech, metadata = self.generator.generate_speech(**request, **kwargs)
+
+        self.speculate(request)
+        return speech, metadata
+
+    def variants(self, request: Dict) -> List[Dict]:
+        variants = []
+        for duration in (request["duration"] + 1, request["duration"] - 1):
+            if MIN_DURATION <= duration <= MAX_DURATION:
+                variants.append(dict(request, duration=duration))
+
+        styles = self.generator.registry.style_names()
+        if request["emotion"] in styles and len(styles) > 1:
+            following = styles[(styles.index(request["emotion"]) + 1) % len(styles)]
+            variants.append(dict(request, emotion=following))
+        return variants
+
+    def speculate(self, request: Dict) -> None:
+        for variant in self.variants(request):
+            key = self.request_key(variant)
+            estimate = variant["duration"] * 130 * 4 // 3 + 200
+            with self._lock:
+                if key in self._cache or key in self._inflight:
+                    continue
+                if (
+                    self.tokens_spent + self.tokens_reserved + estimate
+                    > self.token_budget
+                ):
+                    logger.info("Speculative prefetch budget exhausted")
+                    return
+                self.tokens_reserved += estimate
+                future = self._executor.submit(self._prefetch, key, variant, estimate)
+                self._inflight[key] = future
+
+    def _prefetch(self, key: str, request: Dict, estimate: int) -> Tuple[str, Dict]:
+        try:
+            result = self.generator.generate_speech(
+                **request, priority=BATCH, record_history=False
+            )
+        except Exception as e:
+            logger.warning(f"Speculative prefetch failed: {str(e)}")
+            with self._lock:
+                self.tokens_reserved -= estimate
+                self._inflight.pop(key, None)
+            raise
+
+        spent = result[1]["usage"]["total_tokens"]
+        PREFETCH_TOKENS.inc(spent, kind="spent")
+        with self._lock:
+            self.tokens_reserved -= estimate
+            self.tokens_spent += spent
+            self._inflight.pop(key, None)
+            self._cache[key] = result
+            while len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+        return result
+
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = self.hits + self.inflight_hits + self.misses
+            return {
+                "hits": self.hits,
+                "inflight_hits": self.inflight_hits,
+                "misses": self.misses,
+                "hit_rate": (self.hits + self.inflight_hits) / lookups if lookups else 0.0,
+                "tokens_spent": self.tokens_spent,
+                "tokens_used": self.tokens_used,
+                "token_budget": self.token_budget,
+                "cached": len(self._cache),
+                "inflight": len(self._inflight),
+            }
@@ -0,0 +1,585 @@
+import re
+from bisect import bisect_left, bisect_right
+from functools import lru_cache
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+PARAGRAPH = "paragraph"
+SENTENCE = "sentence"
+PAUSE = "pause"
+EMPHASIS = "emphasis"
+NOTE = "note"
+
+SPAN_KINDS = (PARAGRAPH, SENTENCE, PAUSE, EMPHASIS, NOTE)
+
+_PARAGRAPH_BREAK = re.compile(r"\n[ \t\r\f\v]*\n\s*")
+_BRACKET = re.compile(r"\[[^\]\n]*\]")
+_PAUSE = re.compile(r"\[\s*pause\s*\]", re.IGNORECASE)
+_EMPHASIS = re.compile(r"\*[^*\n]+\*")
+_SENTENCE_END = re.compile(r"[.!?]+[\"'”’)]*(?=\s|$)")
+_WORD = re.compile(r"\w[\w'’-]*")
+_ABBREVIATION = re.compile(
+    r"(?:\b(?:mr|mrs|ms|dr|prof|sr|jr|st|vs|etc|e\.g|i\.e|no|fig)|\b[a-z])\.$",
+    re.IGNORECASE,
+)
+
+
+class Span(NamedTuple):
+    kind: str
+    start: int
+    end: int
+
+
+class SpanIndex:
+    """Offsets of the delivery markup ``build_prompt`` asks the model to emit.
+
+    The text is parsed once; callers such as the TTS chunker or the UI
+    highlighter query the index instead of re-running their own regexes.
+    """
+
+    def __init__(self, text: str):
+        self.text = text
+        self._spans: Dict[str, List[Span]] = {kind: [] for kind in SPAN_KINDS}
+
+        masked = self._index_markup(text)
+        self._word_starts = [m.start() for m in _WORD.finditer(masked)]
+        self._index_paragraphs(text)
+        self._index_sentences(masked)
+
+        self._starts = {
+            kind: [span.start for span in spans] for kind, spans in self._spans.items()
+        }
+
+    def _index_markup(self, text: str) -> str:
+        chars = list(text)
+        for match in _BRACKET.finditer(text):
+            kind = PAUSE if _PAUSE.fullmatch(match.group()) else NOTE
+            self._spans[kind].append(Span(kind, match.start(), match.end()))
+            chars[match.start() : match.end()] = " " * (match.end() - match.start())
+
+        for match in _EMPHASIS.finditer(text):
+            self._spans[EMPHASIS].append(Span(EMPHASIS, match.start(), match.end()))
+
+        return "".join(chars)
+
+    def _index_paragraphs(self, text: str) -> None:
+        start = 0
+        for match in _PARAGRAPH_BREAK.finditer(text):
+            self._add_block(PARAGRAPH, text, start, match.start())
+            start = match.end()
+        self._add_block(PARAGRAPH, text, start, len(text))
+
+    def _index_sentences(self, masked: str) -> None:
+        for paragraph in self._spans[PARAGRAPH]:
+            start = paragraph.start
+            for match in _SENTENCE_END.finditer(masked, paragraph.start, paragraph.end):
+                if _ABBREVIATION.search(masked, max(start, match.start() - 5), match.end()):
+                    continue
+                self._add_block(SENTENCE, masked, start, match.end())
+                start = match.end()
+            self._add_block(SENTENCE, masked, start, paragraph.end)
+
+    def _add_block(self, kind: str, text: str, start: int, end: int) -> None:
+        segment = text[start:end]
+        stripped = segment.strip()
+        if not stripped or not re.search(r"\w", stripped):
+            return
+        start += len(segment) - len(segment.lstrip())
+        end = start + len(stripped)
+        self._spans[kind].append(Span(kind, start, end))
+
+    def spans(self, kind: str) -> List[Span]:
+        return self._spans[kind]
+
+    def count(self, kind: str) -> int:
+        return len(self._spans[kind])
+
+    def text_of(self, span: Span) -> str:
+        return self.text[span.start : span.end]
+
+    def within(self, kind: str, start: int, end: int) -> List[Span]:
+        spans = self._spans[kind]
+        lo = bisect_left(self._starts[kind], start)
+        hi = bisect_left(self._starts[kind], end)
+        return [span for span in spans[lo:hi] if span.end <= end]
+
+    def enclosing(self, kind: str, offset: int) -> Optional[Span]:
+        idx = bisect_right(self._starts[kind], offset) - 1
+        if idx >= 0:
+            span = self._spans[kind][idx]
+            if span.start <= offset < span.end:
+                return span
+        return None
+
+    def word_count(self, start: int = 0, end: Optional[int] = None) -> int:
+        if end is None:
+            end = len(self.text)
+        return bisect_left(self._word_starts, end) - bisect_left(
+            self._word_starts, start
+        )
+
+    def words_before(self, offset: int) -> int:
+        return bisect_left(self._word_starts, offset)
+
+    def chunks(self, max_chars: int) -> List[Tuple[int, int]]:
+        """Sentence-aligned ``(start, end)`` ranges of at most ``max_chars``.
+
+        A single sentence longer than ``max_chars`` is returned on its own.
+        """
+        ranges = []
+        current = None
+        for sentence in self._spans[SENTENCE]:
+            if current and sentence.end - current[0] <= max_chars:
+                current = (current[0], sentence.end)
+            else:
+                if current:
+                    ranges.append(current)
+                current = (sentence.start, sentence.end)
+        if current:
+            ranges.append(current)
+        return ranges
+
+
+# Each index holds its text and a per-word offset list; only the few texts a
+# request works on (the current speech and its sections) are worth keeping.
+@lru_cache(maxsize=4)
+def get_span_index(text: str) -> SpanIndex:
+    return SpanIndex(text)
+
+
+def _band_score(value: float, low: float, high: float, tolerance: float) -> float:
+    if low <= value <= high:
+        return 100.0
+    distance = low - value if value < low else value - high
+    return max(0.0, 100.0 * (1 - distance / tolerance))
+
+
+class StructureAnalyzer:
+    TRANSITIONS = (
+        "first",
+        "firstly",
+        "second",
+        "secondly",
+        "third",
+        "next",
+        "then",
+        "finally",
+        "furthermore",
+        "moreover",
+        "however",
+        "therefore",
+        "meanwhile",
+        "consequently",
+        "similarly",
+        "in addition",
+        "for example",
+        "for instance",
+        "on the other hand",
+        "as a result",
+        "in contrast",
+        "to begin",
+        "let's",
+        "now",
+        "imagine",
+        "in conclusion",
+        "to conclude",
+        "to sum up",
+        "in summary",
+        "ultimately",
+    )
+
+    # Share of spoken words expected in each section, and how far outside the
+    # band a section may drift before it scores zero.
+    INTRO_BAND = (0.08, 0.20)
+    BODY_BAND = (0.55, 0.84)
+    CONCLUSION_BAND = (0.08, 0.20)
+    SECTION_TOLERANCE = 0.15
+
+    TRANSITION_BAND = (0.15, 0.50)
+    TRANSITION_TOLERANCE = 0.30
+
+    # Words between [pause] markers: roughly one every 15-55 seconds at 130 wpm.
+    PAUSE_GAP_BAND = (30, 120)
+    PAUSE_GAP_TOLERANCE = 90
+
+    WEIGHTS = {"balance": 0.45, "transitions": 0.30, "pauses": 0.25}
+
+    _transition_pattern = re.compile(
+        r"\b(?:"
+        + "|".join(re.escape(t) for t in sorted(TRANSITIONS, key=len, reverse=True))
+        + r")\b"
+    )
+
+    def analyze(self, text: str) -> Dict:
+        tally = StructureTally()
+        tally.add(get_span_index(text))
+        return self.report(tally)
+
+    def stream(self, **kwargs) -> "StructureStream":
+        return StructureStream(self, **kwargs)
+
+    def analyze_stream(self, chunks: Iterable[str], **kwargs) -> Dict:
+        """``analyze`` for text arriving in pieces, e.g. lines of a file."""
+        stream = self.stream(**kwargs)
+        for chunk in chunks:
+            stream.feed(chunk)
+        return stream.report()
+
+    def report(self, tally: "StructureTally") -> Dict:
+        report = {
+            "score": 0.0,
+            "sentence_count": tally.sentences.count,
+            "paragraph_count": tally.paragraphs.count,
+            "word_count": tally.words,
+            "sections": {},
+            "balance": 0.0,
+            "transitions": 0.0,
+            "pauses": None,
+        }
+        if not tally.sentences.count or not tally.words:
+            return report
+
+        report["sections"] = tally.sections()
+        report["balance"] = self._balance_score(report["sections"], tally.words)
+        report["transitions"] = self._transition_score(tally)
+        report["pauses"] = self._pause_score(tally)
+
+        components = {
+            name: report[name]
+            for name in self.WEIGHTS
+            if report[name] is not None
+        }
+        weight = sum(self.WEIGHTS[name] for name in components)
+        score = sum(self.WEIGHTS[name] * value for name, value in components.items())
+        report["score"] = round(score / weight, 2)
+        return report
+
+    def _balance_score(self, sections: Dict, total_words: int) -> float:
+        if len(sections) < 3:
+            return 0.0
+
+        bands = {
+            "intro": self.INTRO_BAND,
+            "body": self.BODY_BAND,
+            "conclusion": self.CONCLUSION_BAND,
+        }
+        scores = [
+            _band_score(
+                sections[name]["words"] / total_words, *band, self.SECTION_TOLERANCE
+            )
+            for name, band in bands.items()
+        ]
+        return sum(scores) / len(scores)
+
+    def _transition_score(self, tally: "StructureTally") -> float:
+        return _band_score(
+            tally.transition_sentences / tally.sentences.count,
+            *self.TRANSITION_BAND,
+            self.TRANSITION_TOLERANCE,
+        )
+
+    def _pause_score(self, tally: "StructureTally") -> Optional[float]:
+        if not tally.pauses:
+            # Plain transcripts carry no delivery markup; don't penalize them
+            # for it, but do penalize generated speeches that dropped pauses.
+            return 0.0 if tally.notes else None
+
+        count, mean_gap, m2 = tally.pause_gaps()
+        if mean_gap == 0:
+            return 0.0
+        variation = min(1.0, (m2 / count) ** 0.5 / mean_gap)
+
+        spacing = _band_score(mean_gap, *self.PAUSE_GAP_BAND, self.PAUSE_GAP_TOLERANCE)
+        return spacing * (1 - 0.5 * variation)
+
+
+class _BlockTally:
+    """Count of one block kind plus the bounds needed for section splits."""
+
+    __slots__ = ("count", "first", "second_start", "last", "before_last_end")
+
+    def __init__(self):
+        self.count = 0
+        self.first = None
+        self.second_start = None
+        self.last = None
+        self.before_last_end = None
+
+    def add(self, start: int, end: int, words: int) -> None:
+        block = [start, end, words]
+        if self.count == 0:
+            self.first = block
+        else:
+            if self.count == 1:
+                self.second_start = start
+            self.before_last_end = self.last[1]
+        self.last = block
+        self.count += 1
+
+    def extend(self, end: int, words: int) -> None:
+        # ``first`` and ``last`` are the same list while there is one block.
+        self.last[1] = end
+        self.last[2] += words
+
+
+class StructureTally:
+    """Fixed-size totals ``StructureAnalyzer`` scores from.
+
+    Filled from one ``SpanIndex`` for in-memory text, or from consecutive
+    segments of a stream; both give the same totals, so both give the same
+    scores.
+    """
+
+    def __init__(self):
+        self.words = 0
+        self.paragraphs = _BlockTally()
+        self.sentences = _BlockTally()
+        self.transition_sentences = 0
+        self.notes = 0
+        self.pauses = 0
+        self._last_pause = 0
+        # Running mean and sum of squared deviations of the gaps between
+        # pauses (Welford), so no list of positions is kept.
+        self._gap_mean = 0.0
+        self._gap_m2 = 0.0
+        # End of the last sentence (from a word boundary) and whether it had
+        # a transition, for a sentence that continues in the next segment.
+        self._sentence_tail = ""
+        self._sentence_matched = False
+
+    def add(
+        self,
+        index: SpanIndex,
+        base: int = 0,
+        continues: bool = False,
+        continues_sentence: bool = False,
+    ) -> None:
+        """Add a segment starting at offset ``base`` of the full text.
+
+        ``continues`` marks a segment cut inside a paragraph, so its leading
+        text extends the previous paragraph. ``continues_sentence`` marks a
+        cut between two words of one sentence, so its first sentence extends
+        the previous one.
+        """
+        paragraphs = index.spans(PARAGRAPH)
+        if continues:
+            lead = _PARAGRAPH_BREAK.search(index.text)
+            lead_end = lead.start() if lead else len(index.text)
+            lead_text = index.text[:lead_end].rstrip()
+            if lead_text.strip():
+                self.paragraphs.extend(
+                    base + len(lead_text), index.word_count(0, len(lead_text))
+                )
+            paragraphs = [p for p in paragraphs if p.start >= lead_end]
+        for paragraph in paragraphs:
+            self.paragraphs.add(
+                base + paragraph.start,
+                base + paragraph.end,
+                index.word_count(paragraph.start, paragraph.end),
+            )
+
+        transition = StructureAnalyzer._transition_pattern
+        for i, sentence in enumerate(index.spans(SENTENCE)):
+            words = index.word_count(sentence.start, sentence.end)
+            if i == 0 and continues_sentence:
+                self.sentences.extend(base + sentence.end, words)
+                # The tail lets a transition that spans the cut still match.
+                window = self._sentence_tail + index.text[: sentence.end].lower()
+                matched = self._sentence_matched
+            else:
+                self.sentences.add(base + sentence.start, base + sentence.end, words)
+                window = index.text_of(sentence).lower()
+                matched = False
+            if not matched and transition.search(window):
+                self.transition_sentences += 1
+                matched = True
+            self._sentence_tail = _word_tail(window, _TRANSITION_CHARS)
+            self._sentence_matched = matched
+
+        for pause in index.spans(PAUSE):
+            position = self.words + index.words_before(pause.start)
+            self._add_gap(position - self._last_pause)
+            self._last_pause = position
+            self.pauses += 1
+        self.notes += index.count(NOTE)
+        self.words += index.word_count()
+
+    def _add_gap(self, gap: int) -> None:
+        count = self.pauses + 1
+        delta = gap - self._gap_mean
+        self._gap_mean += delta / count
+        self._gap_m2 += delta * (gap - self._gap_mean)
+
+    def pause_gaps(self) -> Tuple[int, float, float]:
+        """``(count, mean, m2)`` of the gaps, including the one after the last pause."""
+        gap = self.words - self._last_pause
+        count = self.pauses + 1
+        delta = gap - self._gap_mean
+        mean = self._gap_mean + delta / count
+        return count, mean, self._gap_m2 + delta * (gap - mean)
+
+    def sections(self) -> Dict[str, Dict]:
+        # Intro and conclusion are paragraphs. Text with fewer than three has
+        # no sections to balance; treating its first and last sentences as
+        # intro and conclusion would reward any evenly sized run of sentences.
+        blocks = self.paragraphs
+        if blocks.count < 3:
+            return {
+                "body": {
+                    "start": blocks.first[0],
+                    "end": blocks.last[1],
+                    "words": self.words,
+                }
+            }
+        first, last = blocks.first, blocks.last
+        return {
+            "intro": {"start": first[0], "end": first[1], "words": first[2]},
+            "body": {
+                "start": blocks.second_start,
+                "end": blocks.before_last_end,
+                "words": self.words - first[2] - last[2],
+            },
+            "conclusion": {"start": last[0], "end": last[1], "words": last[2]},
+        }
+
+
+_GAP = re.compile(r"\s+(?=\S)")
+_WORD_CHAR = re.compile(r"\w")
+_WORD_GAP = re.compile(r"(?<=\w)\s+(?=\w)")
+_NOTE_CHAR = re.compile(r"[\[\]\n]")
+_TRANSITION_CHARS = max(len(t) for t in StructureAnalyzer.TRANSITIONS) + 1
+
+
+def _word_tail(text: str, size: int) -> str:
+    """The last ``size`` characters of ``text``, starting at a word boundary."""
+    if len(text) <= size:
+        return text
+    tail = text[-size:]
+    space = re.search(r"\s", tail)
+    return tail[space.start() :] if space else ""
+
+
+def _find_cut(
+    buffer: str, limit: int, max_buffer: int
+) -> Optional[Tuple[int, int, bool, bool]]:
+    """Where ``buffer`` can be split without changing how the full text parses.
+
+    Returns ``(segment_end, rest_start, continues, continues_sentence)``:
+    preferably at the last complete paragraph break, otherwise after the last
+    sentence that is followed by more text and ends before ``limit``, the
+    start of a note still open at the end of the buffer. Sentence cuts wait
+    until the paragraph has a word, so it already has a span to extend. Past
+    ``max_buffer`` characters without either, e.g. in an unpunctuated
+    transcript, the buffer is cut between two words. Emphasis is not scored,
+    so an unclosed ``*`` never blocks a cut. ``None`` if the buffer can wait
+    for more text.
+    """
+    cut = None
+    for match in _PARAGRAPH_BREAK.finditer(buffer):
+        if match.end() < len(buffer):
+            cut = match
+    if cut:
+        return cut.start(), cut.end(), False, False
+
+    masked = _BRACKET.sub(lambda match: " " * len(match.group()), buffer)
+    ends = []
+    start = 0
+    for match in _SENTENCE_END.finditer(masked, 0, limit):
+        if _ABBREVIATION.search(masked, max(start, match.start() - 5), match.end()):
+            continue
+        ends.append(match.end())
+        start = match.end()
+    for end in reversed(ends):
+        if _GAP.match(buffer, end) and _WORD_CHAR.search(buffer, 0, end):
+            return end, end, True, False
+
+    if len(buffer) < max_buffer:
+        return None
+    # Gaps in the masked text lie outside notes.
+    gap = None
+    for gap in _WORD_GAP.finditer(masked, 0, limit):
+        pass
+    if gap:
+        return gap.start(), gap.start(), True, True
+    return None
+
+
+class StructureStream:
+    """Incremental ``StructureAnalyzer.analyze`` over text fed in chunks.
+
+    Text is parsed a segment at a time, cut at paragraph breaks, sentence
+    ends or, past ``max_buffer`` characters, between words, and folded into a
+    ``StructureTally``. Memory is bounded by the chunk size and
+    ``max_buffer``, not by the length of the text.
+
+    A ``[`` still unclosed ``max_buffer`` characters later is treated as
+    plain text, as it is when its line ends first; only a note longer than
+    that would parse differently from ``analyze``.
+    """
+
+    def __init__(self, analyzer: StructureAnalyzer, max_buffer: int = 64 * 1024):
+        self.analyzer = analyzer
+        self.max_buffer = max_buffer
+        self.tally = StructureTally()
+        self._buffer = ""
+        self._base = 0
+        self._continues = False
+        self._continues_sentence = False
+        # Start of the note open at the end of the buffer, and how much of
+        # the buffer has been scanned for brackets.
+        self._note: Optional[int] = None
+        self._scanned = 0
+        # Buffer length at which to look for a cut again.
+        self._check_at = 0
+
+    def feed(self, chunk: str) -> None:
+        self._buffer += chunk
+        self._scan_notes()
+        size = len(self._buffer)
+        if size < self._check_at:
+            return
+
+        limit = size
+        if self._note is not None and size - self._note < self.max_buffer:
+            limit = self._note
+        cut = _find_cut(self._buffer, limit, self.max_buffer)
+        if cut is None:
+            # Wait for the buffer to double (or reach max_buffer) so text
+            # that can't be cut yet isn't rescanned for every chunk.
+            if size < self.max_buffer:
+                self._check_at = min(2 * size, self.max_buffer)
+            else:
+                self._check_at = 2 * size
+            return
+
+        segment_end, rest_start, continues, continues_sentence = cut
+        self._add(self._buffer[:segment_end])
+        self._buffer = self._buffer[rest_start:]
+        self._base += rest_start
+        self._continues = continues
+        self._continues_sentence = continues_sentence
+        self._scanned -= rest_start
+        if self._note is not None:
+            self._note = self._note - rest_start if self._note >= rest_start else None
+        self._check_at = 0
+
+    def _scan_notes(self) -> None:
+        # Pairs brackets the way ``_BRACKET`` does: the first ``[`` opens a
+        # note, ``]`` closes it and a newline abandons it.
+        for match in _NOTE_CHAR.finditer(self._buffer, self._scanned):
+            if match.group() != "[":
+                self._note = None
+            elif self._note is None:
+                self._note = match.start()
+        self._scanned = len(self._buffer)
+
+    def _add(self, segment: str) -> None:
+        self.tally.add(
+            SpanIndex(segment), self._base, self._continues, self._continues_sentence
+        )
+
+    def report(self) -> Dict:
+        if self._buffer:
+            self._add(self._buffer)
+            self._base += len(self._buffer)
+            self._buffer = ""
+        return self.analyzer.report(self.tally)
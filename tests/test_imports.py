@@ -0,0 +1,30 @@
+import os
+import subprocess
+import sys
+
+from benchmarks.run_benchmarks import LAZY_MODULES
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_speech_master_import_stays_lazy():
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import speech_master"],
+        cwd=REPO_ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    imported = [
+        line.rsplit("|", 1)[-1].strip()
+        for line in proc.stderr.splitlines()
+        if line.startswith("import time:")
+    ]
+    assert "speech_master" in imported
+
+    eager = [
+        name
+        for name in imported
+        if any(name == lazy or name.startswith(lazy + ".") for lazy in LAZY_MODULES)
+    ]
+    assert eager == []
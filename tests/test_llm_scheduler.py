@@ -0,0 +1,83 @@
+import threading
+import time
+
+from llm_scheduler import BATCH, INTERACTIVE, LLMScheduler
+
+
+def _scheduler(requests_per_minute, **kwargs):
+    return LLMScheduler(
+        {"model": {"requests_per_minute": requests_per_minute}}, **kwargs
+    )
+
+
+def test_aged_batch_backlog_does_not_block_interactive():
+    # 600 rpm: the bucket's burst of 600 goes at once, then 10 requests/s,
+    # so the last 100 batch requests take about 10s to drain.
+    scheduler = _scheduler(600, batch_max_wait=0.5)
+    done = []
+    lock = threading.Lock()
+
+    def batch_call():
+        with lock:
+            done.append(BATCH)
+
+    batch = [
+        scheduler.submit(
+            batch_call, api_key="k", model="model", session_id="batch", priority=BATCH
+        )
+        for _ in range(700)
+    ]
+
+    time.sleep(1.5)
+    submitted = time.monotonic()
+    scheduler.call(
+        lambda: None,
+        api_key="k",
+        model="model",
+        session_id="user",
+        priority=INTERACTIVE,
+    )
+    waited = time.monotonic() - submitted
+
+    assert waited < 1.0
+    assert sum(1 for future in batch if not future.done()) > 0
+
+
+def test_aged_batch_is_still_served_under_interactive_load():
+    scheduler = _scheduler(600, batch_max_wait=0.2, interactive_per_aged_batch=3)
+    order = []
+    lock = threading.Lock()
+
+    def call(kind):
+        def run():
+            with lock:
+                order.append(kind)
+
+        return run
+
+    # Use up the burst so every later request waits on the bucket.
+    for future in [
+        scheduler.submit(call("warmup"), api_key="k", model="model", priority=BATCH)
+        for _ in range(600)
+    ]:
+        future.result()
+
+    batch = scheduler.submit(
+        call(BATCH), api_key="k", model="model", session_id="batch", priority=BATCH
+    )
+    interactive = [
+        scheduler.submit(
+            call(INTERACTIVE),
+            api_key="k",
+            model="model",
+            session_id=f"user-{i}",
+            priority=INTERACTIVE,
+        )
+        for i in range(20)
+    ]
+
+    batch.result(timeout=5)
+    served = [kind for kind in order if kind != "warmup"]
+    assert served.index(BATCH) < len(interactive)
+    for future in interactive:
+        future.result(timeout=5)
@@ -0,0 +1,71 @@
+import random
+import tracemalloc
+
+import pytest
+
+from benchmarks.synthetic import synthetic_transcript
+from speech_master import PresentationCoach
+from speech_structure import _BRACKET, StructureAnalyzer
+
+PIECES = (
+    "Hello", "world.", "Dr.", "Smith", "said", "e.g.", "this!", "Next?", "...",
+    "J.", "(aside.)", "\"Quoted.\"", "first,", "however", "in", "conclusion",
+    "on the other", "hand", "[pause]", "[Walk to center]", "*really*", "*",
+    "[", "]", "\n", "\n\n", "\n \n  ", "  ", "\t",
+)
+
+
+def _chunks(text, size, rng):
+    start = 0
+    while start < len(text):
+        end = start + rng.randint(1, size)
+        yield text[start:end]
+        start = end
+
+
+@pytest.mark.parametrize("seed", range(150))
+def test_stream_matches_in_memory_on_random_markup(seed):
+    rng = random.Random(seed)
+    text = " ".join(rng.choice(PIECES) for _ in range(rng.randint(0, 300)))
+    analyzer = StructureAnalyzer()
+    expected = analyzer.analyze(text)
+    # Only a note longer than max_buffer may parse differently.
+    longest = max((len(m.group()) for m in _BRACKET.finditer(text)), default=0)
+    max_buffer = max(32, longest + 1)
+    for size in (1, 5, 40):
+        result = analyzer.analyze_stream(_chunks(text, size, rng), max_buffer=max_buffer)
+        assert result == expected
+
+
+def test_stray_markup_does_not_hold_the_buffer():
+    text = synthetic_transcript(5_000, "unbalanced")
+    analyzer = StructureAnalyzer()
+    stream = analyzer.stream(max_buffer=512)
+    largest = 0
+    for chunk in _chunks(text, 16, random.Random(0)):
+        stream.feed(chunk)
+        largest = max(largest, len(stream._buffer))
+
+    assert largest <= 3 * 512
+    assert stream.report() == analyzer.analyze(text)
+
+
+@pytest.mark.parametrize("variant", ("punctuated", "unpunctuated", "unbalanced"))
+def test_stream_peak_memory_is_flat(variant, tmp_path):
+    coach = PresentationCoach()
+    peaks = []
+    for size in (2_000, 40_000):
+        path = tmp_path / f"{variant}-{size}.txt"
+        text = synthetic_transcript(size, variant)
+        path.write_text(text, encoding="utf-8")
+        assert coach.analyze_stream(str(path))["structure"] == coach.analyze_structure(
+            text
+        )
+        del text
+
+        tracemalloc.start()
+        coach.analyze_stream(str(path), chunk_size=1024, max_buffer=4096)
+        peaks.append(tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+
+    assert peaks[1] <= 2 * peaks[0]
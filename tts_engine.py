@@ -0,0 +1,264 @@
+import hashlib
+import json
+import logging
+import os
+import queue
+import sys
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable, Dict, Optional
+
+from metrics import REGISTRY, timed
+
+logger = logging.getLogger(__name__)
+
+STARTING = "starting"
+READY = "ready"
+FAILED = "failed"
+
+PREVIEW_TEXT = "Hello! This is how your speech will sound with this voice."
+
+ENGINE_READY = REGISTRY.gauge(
+    "speech_master_tts_engine_ready",
+    "1 once the TTS engine is warmed up for a voice, 0 while starting or failed.",
+    labelnames=("voice",),
+)
+WARMUP_SECONDS = REGISTRY.gauge(
+    "speech_master_tts_warmup_seconds",
+    "Time spent loading the driver and warming up each voice.",
+    labelnames=("voice",),
+)
+
+
+def _pyttsx3_engine():
+    if sys.platform == "win32":
+        # SAPI5 is a COM server; COM must be initialized on the owner thread.
+        import comtypes
+
+        comtypes.CoInitialize()
+    import pyttsx3
+
+    return pyttsx3.init()
+
+
+class TTSEngineWorker:
+    """The process's TTS engine, created and driven by a single thread.
+
+    Speech drivers keep process-wide state (espeak has one synthesizer and
+    one audio callback) and are not thread-safe, so a second engine would
+    share and clobber that state rather than isolate it. Instead one thread
+    owns the only engine and runs requests one at a time, applying the
+    requested voice's settings before each, so a voice switch never changes
+    an engine while another request is using it.
+
+    ``start`` warms the engine in the background: it loads the driver and
+    renders a short preview for each ``SpeechGenerator.TTS_VOICES`` entry,
+    which also loads each voice's data. Requests made during warm-up queue
+    behind it instead of starting a cold engine.
+    """
+
+    def __init__(
+        self,
+        voices: Dict[str, Dict],
+        preview_folder: str = os.path.join("speech_outputs", "audio", "previews"),
+        engine_factory: Optional[Callable] = None,
+        preview_text: str = PREVIEW_TEXT,
+    ):
+        self.voices = voices
+        self.preview_folder = preview_folder
+        self.engine_factory = engine_factory or _pyttsx3_engine
+        self.preview_text = preview_text
+
+        self.ready = threading.Event()
+        self.error: Optional[str] = None
+        self._status = {
+            name: {"state": STARTING, "warmup_seconds": None, "preview": None, "error": None}
+            for name in voices
+        }
+        self._voice_ids: Dict[str, str] = {}
+        self._current: Optional[str] = None
+
+        self._jobs: "queue.Queue" = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="tts", daemon=True)
+        self._started = False
+        self._stopped = False
+        self._lock = threading.Lock()
+        for name in voices:
+            ENGINE_READY.set(0, voice=name)
+
+    def start(self) -> "TTSEngineWorker":
+        with self._lock:
+            if not self._started:
+                os.makedirs(self.preview_folder, exist_ok=True)
+                self._thread.start()
+                self._started = True
+        return self
+
+    def warm(self, timeout: Optional[float] = None) -> Dict:
+        self.start()
+        self.ready.wait(timeout)
+        return self.health()
+
+    def stop(self) -> None:
+        self._jobs.put(None)
+
+    def synthesize(
+        self, voice: str, text: str, output_path: str, timeout: Optional[float] = None
+    ) -> str:
+        if voice not in self.voices:
+            raise ValueError(f"Unknown voice: {voice}")
+        self.start()
+        future = Future()
+        with self._lock:
+            # Once the owner thread has exited nothing would ever run the
+            # job, so fail now instead of waiting forever.
+            if self._stopped or not self._thread.is_alive():
+                raise ValueError("TTS engine has stopped")
+            self._jobs.put((voice, text, output_path, future))
+        return future.result(timeout)
+
+    def preview(self, voice: str) -> Optional[str]:
+        """Path of the pre-rendered preview, or ``None`` until it is ready."""
+        if voice not in self.voices:
+            raise ValueError(f"Unknown voice: {voice}")
+        return self._status[voice]["preview"]
+
+    def health(self) -> Dict:
+        voices = {name: dict(status) for name, status in self._status.items()}
+        return {
+            "ready": all(status["state"] == READY for status in voices.values()),
+            "queued": self._jobs.qsize(),
+            "error": self.error,
+            "voices": voices,
+        }
+
+    def _run(self) -> None:
+        try:
+            self._serve(self._load())
+        finally:
+            with self._lock:
+                self._stopped = True
+            # Jobs queued behind stop() would otherwise never complete.
+            while not self._jobs.empty():
+                job = self._jobs.get_nowait()
+                if job is not None and job[3].set_running_or_notify_cancel():
+                    job[3].set_exception(ValueError("TTS engine has stopped"))
+
+    def _load(self):
+        engine = None
+        try:
+            started = time.perf_counter()
+            engine = self.engine_factory()
+            installed = list(engine.getProperty("voices"))
+            if not installed:
+                raise RuntimeError("no voices installed")
+            load_seconds = time.perf_counter() - started
+        except Exception as e:
+            logger.error(f"Failed to initialize TTS engine: {str(e)}")
+            self.error = str(e)
+            engine = None
+            for status in self._status.values():
+                status.update(state=FAILED, error=str(e))
+        else:
+            for name, config in self.voices.items():
+                index = min(config.get("voice_index", 0), len(installed) - 1)
+                self._voice_ids[name] = installed[index].id
+            for name in self.voices:
+                self._warm_voice(engine, name, load_seconds)
+                load_seconds = 0.0
+        finally:
+            self.ready.set()
+        return engine
+
+    def _serve(self, engine) -> None:
+        while True:
+            job = self._jobs.get()
+            if job is None:
+                break
+            voice, text, output_path, future = job
+            if not future.set_running_or_notify_cancel():
+                continue
+            if engine is None or self._status[voice]["state"] != READY:
+                future.set_exception(
+                    ValueError(
+                        f"TTS engine not available for {voice}: "
+                        f"{self._status[voice]['error']}"
+                    )
+                )
+                continue
+            try:
+                self._render(engine, voice, text, output_path)
+            except Exception as e:
+                future.set_exception(e)
+            else:
+                future.set_result(output_path)
+
+    def _apply(self, engine, voice: str) -> None:
+        if voice == self._current:
+            return
+        config = self.voices[voice]
+        engine.setProperty("voice", self._voice_ids[voice])
+        engine.setProperty("rate", config["rate"])
+        engine.setProperty("volume", config["volume"])
+        self._current = voice
+
+    def _render(self, engine, voice: str, text: str, output_path: str) -> None:
+        self._apply(engine, voice)
+        with timed("tts_run_and_wait"):
+            engine.save_to_file(text, output_path)
+            engine.runAndWait()
+
+    def _warm_voice(self, engine, voice: str, load_seconds: float) -> None:
+        status = self._status[voice]
+        started = time.perf_counter()
+        try:
+            # The first synthesis with a voice loads its data. Rendering the
+            # preview pays that cost here instead of in the first request.
+            path = os.path.join(
+                self.preview_folder, f"{voice}-{self._fingerprint(voice)}.wav"
+            )
+            if os.path.exists(path):
+                warm_path = path + ".warmup"
+                self._render(engine, voice, self.preview_text, warm_path)
+                if os.path.exists(warm_path):
+                    os.remove(warm_path)
+            else:
+                partial = path + ".partial"
+                self._render(engine, voice, self.preview_text, partial)
+                os.replace(partial, path)
+        except Exception as e:
+            logger.error(f"Failed to warm up TTS voice {voice}: {str(e)}")
+            status.update(state=FAILED, error=str(e))
+            return
+
+        seconds = load_seconds + time.perf_counter() - started
+        status.update(state=READY, warmup_seconds=seconds, preview=path)
+        WARMUP_SECONDS.set(seconds, voice=voice)
+        ENGINE_READY.set(1, voice=voice)
+        logger.info(f"TTS voice {voice} ready in {seconds:.2f}s")
+
+    def _fingerprint(self, voice: str) -> str:
+        # Previews are reused across restarts until the voice settings change.
+        config = self.voices[voice]
+        settings = {
+            "voice": self._voice_ids[voice],
+            "rate": config["rate"],
+            "volume": config["volume"],
+            "text": self.preview_text,
+        }
+        encoded = json.dumps(settings, sort_keys=True).encode("utf-8")
+        return hashlib.sha256(encoded).hexdigest()[:12]
+
+
+_worker = None
+_worker_lock = threading.Lock()
+
+
+def get_tts_engine(voices: Dict[str, Dict], **kwargs) -> TTSEngineWorker:
+    """The process-wide TTS engine shared by every ``SpeechGenerator``."""
+    global _worker
+    with _worker_lock:
+        if _worker is None:
+            _worker = TTSEngineWorker(voices, **kwargs)
+        return _worker